@@ -3,15 +3,20 @@ IEI Diagnostic Chatbot - Streamlit Interface
 Interactive diagnostic tool using Shannon's Information Theory
 """
 
+from functools import lru_cache
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
 from iei_diagnostic_engine import (
     IEIDiagnosticEngine,
     QUESTIONS,
     IEI_CATEGORIES,
-    calculate_entropy
+    CATEGORY_INDEX,
+    FIRST_QUESTION,
+    calculate_entropy,
+    get_static_tables
 )
 
 # ============================================================================
@@ -83,16 +88,67 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# ============================================================================
+# CACHED COMPUTATIONS
+# ============================================================================
+
+@st.cache_resource
+def load_static_tables() -> dict:
+    """Engine lookup tables, built once and shared by every session"""
+    return get_static_tables()
+
+@lru_cache(maxsize=None)
+def question_text(q_id: str) -> str:
+    """Display text for a question ID"""
+    return QUESTIONS[q_id].text
+
+# Display names for categories in IEI_CATEGORIES order, built once instead of per render
+PRETTY_CATEGORIES = tuple(cat.replace('_', ' ') for cat in IEI_CATEGORIES)
+
+def pretty_category(category: str) -> str:
+    """Display name for a category ID"""
+    idx = CATEGORY_INDEX.get(category)
+    return PRETTY_CATEGORIES[idx] if idx is not None else 'Unknown'
+
+# Number of most recent interview answers shown without expanding the history
+HISTORY_WINDOW = 5
+
+def new_history() -> dict:
+    """Empty interview history, stored as parallel columns"""
+    return {'qid': [], 'text': [], 'answer': []}
+
+def record_answer(q_id: str, text: str, answer: str):
+    """Append one question/answer pair to the interview history"""
+    history = st.session_state.history
+    history['qid'].append(q_id)
+    history['text'].append(text)
+    history['answer'].append(answer)
+
+def initial_entropy_history() -> np.ndarray:
+    """Entropy trajectory seeded with the entropy of the current prior"""
+    return np.array([calculate_entropy(st.session_state.engine.probs)])
+
+def render_history_item(i: int, text: str, answer: str):
+    """Collapsible question/answer entry in the interview history"""
+    with st.expander(f"Q{i}: {text[:50]}..."):
+        st.write(f"**Question:** {text}")
+        st.write(f"**Answer:** {answer}")
+
+# Probability color levels: very low / low / medium / high (strictly above each bin)
+PROB_LEVEL_BINS = np.array([0.05, 0.2, 0.5])
+PROB_LEVEL_LABELS = np.array(['⚪', '🟢', '🟡', '🔴'])
+
 # ============================================================================
 # SESSION STATE INITIALIZATION
 # ============================================================================
 
 if 'engine' not in st.session_state:
-    st.session_state.engine = IEIDiagnosticEngine()
-    st.session_state.history = []
+    st.session_state.engine = IEIDiagnosticEngine(**load_static_tables())
+    st.session_state.history = new_history()
     st.session_state.current_result = None
     st.session_state.diagnosis_complete = False
     st.session_state.question_count = 0
+    st.session_state.entropy_history = initial_entropy_history()
 
 # ============================================================================
 # HEADER
@@ -120,19 +176,27 @@ with st.sidebar:
     # Current statistics
     st.subheader("Current Session")
     
+    # Entropy and top-3 come precomputed on the latest result; recompute
+    # only before the first answer
+    summary = st.session_state.current_result
+    if summary is not None and 'top3' in summary:
+        current_entropy = summary['entropy']
+        top_3 = summary['top3']
+    else:
+        current_entropy = st.session_state.engine.entropy
+        top_3 = st.session_state.engine.get_top_diagnoses(n=3)
+    
     col1, col2 = st.columns(2)
     with col1:
         st.metric("Questions Asked", st.session_state.question_count)
     with col2:
-        current_entropy = calculate_entropy(st.session_state.engine.current_probs)
         st.metric("Entropy", f"{current_entropy:.2f} bits")
     
     # Top 3 leading diagnoses
     st.subheader("Leading Categories")
-    top_3 = st.session_state.engine.get_top_diagnoses(n=3)
     
     for i, (category, prob) in enumerate(top_3, 1):
-        st.write(f"{i}. **{category.replace('_', ' ')}**")
+        st.write(f"{i}. **{pretty_category(category)}**")
         st.progress(prob)
         st.caption(f"{prob*100:.1f}%")
     
@@ -141,10 +205,11 @@ with st.sidebar:
     # Reset button
     if st.button("🔄 Reset & Start New Case"):
         st.session_state.engine.reset()
-        st.session_state.history = []
+        st.session_state.history = new_history()
         st.session_state.current_result = None
         st.session_state.diagnosis_complete = False
         st.session_state.question_count = 0
+        st.session_state.entropy_history = initial_entropy_history()
         st.rerun()
     
     # About section
@@ -180,26 +245,26 @@ with tab1:
         if result.get('status') == 'pattern_detected':
             st.write(f"**Suspected Diagnosis:** {result.get('suspected_diagnosis', 'Unknown')}")
             st.write(f"**Confidence:** {result.get('confidence', 0)*100:.1f}%")
-            st.write(f"**Category:** {result.get('category', 'Unknown').replace('_', ' ')}")
+            st.write(f"**Category:** {pretty_category(result.get('category'))}")
             
             confirm_with = result.get('confirm_with', [])
             if confirm_with:
                 st.info("**Recommended confirmatory questions:**")
                 for q_id in confirm_with:
                     if q_id in QUESTIONS:
-                        st.write(f"- {QUESTIONS[q_id].text}")
+                        st.write(f"- {question_text(q_id)}")
         
         elif result.get('status') == 'diagnosis_reached':
             top_dx = result.get('top_diagnosis')
             if top_dx:
-                st.write(f"**Primary Category:** {top_dx[0].replace('_', ' ')}")
+                st.write(f"**Primary Category:** {pretty_category(top_dx[0])}")
                 st.write(f"**Confidence:** {top_dx[1]*100:.1f}%")
             
             differential = result.get('differential', [])
             if differential:
                 st.write("**Differential Diagnosis (All Categories):**")
                 for i, (cat, prob) in enumerate(differential, 1):
-                    st.write(f"{i}. {cat.replace('_', ' ')}: {prob*100:.1f}%")
+                    st.write(f"{i}. {pretty_category(cat)}: {prob*100:.1f}%")
         
         elif result.get('status') == 'questions_exhausted':
             st.write("**Diagnostic Assessment:**")
@@ -208,7 +273,7 @@ with tab1:
             if differential:
                 st.write("**Top Differential Diagnosis:**")
                 for i, (cat, prob) in enumerate(differential, 1):
-                    st.write(f"{i}. {cat.replace('_', ' ')}: {prob*100:.1f}%")
+                    st.write(f"{i}. {pretty_category(cat)}: {prob*100:.1f}%")
         
         st.markdown('</div>', unsafe_allow_html=True)
         
@@ -220,16 +285,17 @@ with tab1:
         with col2:
             if st.button("🔄 Start New Case"):
                 st.session_state.engine.reset()
-                st.session_state.history = []
+                st.session_state.history = new_history()
                 st.session_state.current_result = None
                 st.session_state.diagnosis_complete = False
                 st.session_state.question_count = 0
+                st.session_state.entropy_history = initial_entropy_history()
                 st.rerun()
     
     # Show current question
     else:
         # Start with initial question if no history
-        if not st.session_state.history:
+        if not st.session_state.history['qid']:
             st.markdown('<div class="question-box">', unsafe_allow_html=True)
             st.write("### Let's begin the diagnostic interview")
             st.write("I'll ask you strategic questions to narrow down the diagnosis efficiently.")
@@ -237,7 +303,7 @@ with tab1:
             st.markdown('</div>', unsafe_allow_html=True)
             
             # Show first question (highest IG - Q15)
-            first_q_id = "Q15"
+            first_q_id = FIRST_QUESTION
             first_q = QUESTIONS[first_q_id]
             
             st.markdown('<div class="question-box">', unsafe_allow_html=True)
@@ -255,13 +321,12 @@ with tab1:
             if st.button("Submit Answer", key=f"submit_{first_q_id}"):
                 # Process answer
                 result = st.session_state.engine.process_answer(first_q_id, answer)
-                st.session_state.history.append({
-                    'question': first_q.text,
-                    'answer': answer,
-                    'question_id': first_q_id
-                })
+                record_answer(first_q_id, first_q.text, answer)
                 st.session_state.current_result = result
                 st.session_state.question_count += 1
+                st.session_state.entropy_history = np.append(
+                    st.session_state.entropy_history, result['entropy']
+                )
                 
                 # Check if diagnosis complete
                 if result['status'] in ['pattern_detected', 'diagnosis_reached', 'questions_exhausted']:
@@ -309,13 +374,12 @@ with tab1:
             if st.button("Submit Answer", key=f"submit_{next_q_id}"):
                 # Process answer
                 result = st.session_state.engine.process_answer(next_q_id, answer)
-                st.session_state.history.append({
-                    'question': next_q.text,
-                    'answer': answer,
-                    'question_id': next_q_id
-                })
+                record_answer(next_q_id, next_q.text, answer)
                 st.session_state.current_result = result
                 st.session_state.question_count += 1
+                st.session_state.entropy_history = np.append(
+                    st.session_state.entropy_history, result['entropy']
+                )
                 
                 # Check if diagnosis complete
                 if result['status'] in ['pattern_detected', 'diagnosis_reached', 'questions_exhausted']:
@@ -324,14 +388,21 @@ with tab1:
                 st.rerun()
     
     # Show history
-    if st.session_state.history:
+    if st.session_state.history['qid']:
         st.divider()
         st.subheader("📜 Interview History")
         
-        for i, item in enumerate(st.session_state.history, 1):
-            with st.expander(f"Q{i}: {item['question'][:50]}..."):
-                st.write(f"**Question:** {item['question']}")
-                st.write(f"**Answer:** {item['answer']}")
+        texts = st.session_state.history['text']
+        answers = st.session_state.history['answer']
+        recent_start = max(len(texts) - HISTORY_WINDOW, 0)
+        
+        # Older questions are only rendered on request
+        if recent_start and st.checkbox(f"Show {recent_start} earlier questions"):
+            for i, (text, answer) in enumerate(zip(texts[:recent_start], answers[:recent_start]), 1):
+                render_history_item(i, text, answer)
+        
+        for i, (text, answer) in enumerate(zip(texts[recent_start:], answers[recent_start:]), recent_start + 1):
+            render_history_item(i, text, answer)
 
 # ============================================================================
 # TAB 2: PROBABILITY ANALYSIS
@@ -343,44 +414,61 @@ with tab2:
     # Current probability distribution
     st.subheader("Current Probability Distribution")
     
-    probs_df = pd.DataFrame([
-        {'Category': cat.replace('_', ' '), 'Probability': prob}
-        for cat, prob in st.session_state.engine.current_probs.items()
-    ]).sort_values('Probability', ascending=False)
+    # Sort the posterior vector directly; it is aligned to IEI_CATEGORIES
+    probs = st.session_state.engine.probs
+    order = np.argsort(-probs)
+    probs = probs[order]
+    names = [PRETTY_CATEGORIES[i] for i in order]
     
-    # Create bar chart
-    fig = px.bar(
-        probs_df,
-        x='Category',
-        y='Probability',
-        title='Probability Distribution Across IEI Categories',
-        color='Probability',
-        color_continuous_scale='Blues'
-    )
-    fig.update_layout(
-        xaxis_title="IEI Category",
-        yaxis_title="Probability",
-        yaxis_range=[0, 1],
-        showlegend=False
-    )
+    # Bar chart skeleton is built once per session; each rerun only swaps the data
+    if 'prob_fig' not in st.session_state:
+        st.session_state.prob_fig = go.Figure(go.Bar(
+            marker=dict(colorscale='Blues', showscale=True)
+        ))
+        st.session_state.prob_fig.update_layout(
+            title='Probability Distribution Across IEI Categories',
+            xaxis_title="IEI Category",
+            yaxis_title="Probability",
+            yaxis_range=[0, 1],
+            showlegend=False
+        )
+    fig = st.session_state.prob_fig
+    fig.data[0].x = names
+    fig.data[0].y = probs
+    fig.data[0].marker.color = probs
     st.plotly_chart(fig, use_container_width=True)
     
     # Entropy evolution over time
-    if st.session_state.history:
+    if st.session_state.history['qid']:
         st.subheader("🎲 Entropy Evolution")
         st.write("Watch how uncertainty decreases with each question:")
         
-        # We'd need to track entropy at each step for this
-        # For now, show current entropy
-        current_entropy = calculate_entropy(st.session_state.engine.current_probs)
+        entropy_history = st.session_state.entropy_history
+        initial_entropy = entropy_history[0]
+        current_entropy = entropy_history[-1]
+        
+        # Line chart skeleton is built once per session; each rerun only swaps the data
+        if 'entropy_fig' not in st.session_state:
+            st.session_state.entropy_fig = go.Figure(go.Scatter(
+                y=np.zeros(1), mode='lines+markers'
+            ))
+            st.session_state.entropy_fig.update_layout(
+                xaxis_title="Questions Asked",
+                yaxis_title="Entropy (bits)",
+                showlegend=False
+            )
+        fig = st.session_state.entropy_fig
+        fig.data[0].x = np.arange(len(entropy_history))
+        fig.data[0].y = entropy_history
+        st.plotly_chart(fig, use_container_width=True)
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Initial Entropy", "2.43 bits")
+            st.metric("Initial Entropy", f"{initial_entropy:.2f} bits")
         with col2:
             st.metric("Current Entropy", f"{current_entropy:.2f} bits")
         with col3:
-            reduction = ((2.43 - current_entropy) / 2.43) * 100
+            reduction = ((initial_entropy - current_entropy) / initial_entropy) * 100
             st.metric("Entropy Reduction", f"{reduction:.1f}%")
         
         st.info("💡 Lower entropy = Higher diagnostic certainty")
@@ -388,30 +476,21 @@ with tab2:
     # Detailed probability table
     st.subheader("📊 Detailed Probabilities")
     
-    # Color-coded probability display
-    for idx, row in probs_df.iterrows():
-        cat = row['Category']
-        prob = row['Probability']
-        
-        # Color code based on probability
-        if prob > 0.5:
-            color = "🔴"  # High probability
-        elif prob > 0.2:
-            color = "🟡"  # Medium probability
-        elif prob > 0.05:
-            color = "🟢"  # Low probability
-        else:
-            color = "⚪"  # Very low probability
-        
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            st.write(f"{color} **{cat}**")
-        with col2:
-            st.write(f"{prob*100:.1f}%")
-        st.progress(prob)
-        
-        if idx < len(probs_df) - 1:  # Don't add divider after last item
-            st.divider()
+    # Color-coded probability table rendered as a single widget
+    st.dataframe(
+        {
+            'Level': PROB_LEVEL_LABELS[np.searchsorted(PROB_LEVEL_BINS, probs, side='left')],
+            'Category': names,
+            'Probability': probs * 100
+        },
+        column_config={
+            'Probability': st.column_config.ProgressColumn(
+                'Probability', min_value=0, max_value=100, format='%.1f%%'
+            )
+        },
+        hide_index=True,
+        use_container_width=True
+    )
 
 # ============================================================================
 # TAB 3: CASE SUMMARY
@@ -431,14 +510,11 @@ with tab3:
     # Clinical findings summary
     st.subheader("Clinical Findings")
     
-    if st.session_state.history:
-        findings_df = pd.DataFrame([
-            {
-                'Question': item['question'],
-                'Finding': item['answer']
-            }
-            for item in st.session_state.history
-        ])
+    if st.session_state.history['qid']:
+        findings_df = pd.DataFrame({
+            'Question': st.session_state.history['text'],
+            'Finding': st.session_state.history['answer']
+        })
         st.dataframe(findings_df, use_container_width=True, hide_index=True)
     else:
         st.info("No findings recorded yet. Start the diagnostic interview!")
@@ -456,14 +532,14 @@ with tab3:
         if result.get('status') == 'pattern_detected':
             st.write(f"- Pattern-based diagnosis: **{result.get('suspected_diagnosis', 'Unknown')}**")
             st.write(f"- Confidence level: **{result.get('confidence', 0)*100:.1f}%**")
-            st.write(f"- Primary category: **{result.get('category', 'Unknown').replace('_', ' ')}**")
+            st.write(f"- Primary category: **{pretty_category(result.get('category'))}**")
         
         elif result.get('status') == 'diagnosis_reached':
             st.write("**Top Differential Diagnosis:**")
             differential = result.get('differential', [])
             if differential:
                 for i, (cat, prob) in enumerate(differential, 1):
-                    st.write(f"{i}. {cat.replace('_', ' ')}: **{prob*100:.1f}%**")
+                    st.write(f"{i}. {pretty_category(cat)}: **{prob*100:.1f}%**")
             else:
                 st.warning("No differential diagnosis available.")
         
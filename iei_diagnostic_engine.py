@@ -4,10 +4,27 @@ Based on Shannon's Information Theory + Clinical Pattern Recognition
 Author: Saul (with Claude's assistance)
 """
 
+import sys
+from math import log2
 import numpy as np
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Tuple, Optional, Union
+from dataclasses import dataclass, field
+from enum import IntEnum
 from collections import defaultdict
+from collections.abc import Mapping
+from functools import lru_cache
+from itertools import combinations
+
+try:
+    from iei_kernels import (
+        best_weighted_question, masked_sum, log_posterior_update, posterior_update
+    )
+except ImportError:  # Numba not installed: fall back to the NumPy tensor path
+    best_weighted_question = None
+    masked_sum = None
+    log_posterior_update = None
+    posterior_update = None
 
 # ============================================================================
 # IEI CATEGORY DEFINITIONS (IUIS 2024 Classification - Broad Groups)
@@ -24,6 +41,12 @@ IEI_CATEGORIES = [
     'Bone_Marrow_Failure'       # Congenital neutropenia, true marrow failure (NOT WAS - that's Combined_ID)
 ]
 
+# Integer category IDs: the position of each category in every probability
+# vector used by the engine (Category.Phagocyte_Defect == 2). Names are only
+# needed at the I/O boundary.
+Category = IntEnum('Category', [(cat, i) for i, cat in enumerate(IEI_CATEGORIES)])
+CATEGORY_INDEX = {category.name: int(category) for category in Category}
+
 # ============================================================================
 # DATA STRUCTURES
 # ============================================================================
@@ -36,16 +59,50 @@ class PathognomicPattern:
     probability: float
     category: str
     confirm_with: List[str]  # Question IDs to ask for confirmation
+    trigger_mask: int = field(default=0, repr=False, compare=False)  # Set from TRIGGER_BITS
+    # (question_id, expected_answer) for each well-formed "Qx:answer" trigger
+    parsed_triggers: Tuple[Tuple[str, str], ...] = field(
+        init=False, repr=False, compare=False
+    )
     
-@dataclass
+    def __post_init__(self):
+        self.parsed_triggers = tuple(
+            tuple(parts) for parts in (trigger.split(':') for trigger in self.triggers)
+            if len(parts) == 2
+        )
+    
+# Canonical answer_options tuples: questions with the same options share one
+# object, so e.g. `question.answer_options is BINARY_OPTIONS` is a valid check
+_OPTIONS_INTERN: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+def intern_options(options: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Return the shared tuple equal to options"""
+    return _OPTIONS_INTERN.setdefault(options, options)
+
+BINARY_OPTIONS = intern_options((sys.intern("No"), sys.intern("Yes")))
+
+@dataclass(frozen=True, slots=True)
 class Question:
     """Represents a diagnostic question"""
     id: str
-    text: str
-    answer_options: List[str]
+    answer_options: Tuple[str, ...]
     base_information_gain: float
     is_nodal: bool = False
     nodal_weight: float = 1.0
+    
+    def __post_init__(self):
+        # Intern IDs and option strings so lookups against them hit the
+        # identity fast path; options are stored as an immutable tuple
+        object.__setattr__(self, 'id', sys.intern(self.id))
+        object.__setattr__(
+            self, 'answer_options',
+            intern_options(tuple(sys.intern(option) for option in self.answer_options))
+        )
+    
+    @property
+    def text(self) -> str:
+        """Question wording, decoded on demand from QUESTION_TEXT_BLOB"""
+        return get_question_text(self.id)
 
 # ============================================================================
 # PATHOGNOMONIC PATTERNS - Clinical Pearl Recognition
@@ -103,6 +160,46 @@ PATHOGNOMONIC_PATTERNS = [
     ),
 ]
 
+def trigger_satisfied(expected_answer: str, actual: Optional[str]) -> bool:
+    """Whether an answer satisfies one trigger's expected answer"""
+    # Handle compound triggers like "Ataxia+Telangiectasia"
+    if '+' in expected_answer:
+        actual = actual or ''
+        return expected_answer in actual or actual == "Yes"
+    return actual == expected_answer
+
+# Bit position for every distinct parsed (question_id, expected_answer) trigger,
+# so each pattern can be checked with one AND/compare against the answered bitmask
+TRIGGER_BITS = {
+    trigger: bit
+    for bit, trigger in enumerate(dict.fromkeys(
+        parsed
+        for pattern in PATHOGNOMONIC_PATTERNS
+        for parsed in pattern.parsed_triggers
+    ))
+}
+assert len(TRIGGER_BITS) <= 64, "Trigger bitmask no longer fits in 64 bits"
+
+# question_id -> [(expected_answer, bit)] for the triggers that question feeds
+TRIGGERS_BY_QUESTION = defaultdict(list)
+for (_q_id, _expected), _bit in TRIGGER_BITS.items():
+    TRIGGERS_BY_QUESTION[_q_id].append((_expected, _bit))
+
+for _pattern in PATHOGNOMONIC_PATTERNS:
+    _pattern.trigger_mask = sum(1 << TRIGGER_BITS[t] for t in _pattern.parsed_triggers)
+
+def answer_trigger_bits(question_id: str, answer: str) -> int:
+    """Bits of TRIGGER_BITS satisfied by one answer"""
+    bits = 0
+    for expected_answer, bit in TRIGGERS_BY_QUESTION.get(question_id, ()):
+        if trigger_satisfied(expected_answer, answer):
+            bits |= 1 << bit
+    return bits
+
+def question_trigger_bits(question_id: str) -> int:
+    """All bits of TRIGGER_BITS that belong to one question"""
+    return sum(1 << bit for _, bit in TRIGGERS_BY_QUESTION.get(question_id, ()))
+
 # ============================================================================
 # SPECIFIC SYNDROMES - Subcategory Layer (40-50 diagnoses)
 # ============================================================================
@@ -305,273 +402,327 @@ EVIDENCE_RULES = {
 # QUESTION DEFINITIONS WITH NODAL WEIGHTS
 # ============================================================================
 
-QUESTIONS = {
+_QUESTION_TABLE = (
+    # (id, text, answer_options, base_information_gain, is_nodal, nodal_weight)
     # NODAL QUESTIONS - Major category routers
-    "Q3": Question(
-        id="Q3",
-        text="Recurrent infections?",
-        answer_options=["Yes_single_pathogen", "Yes_multiple_pathogens", "Non_infectious_manifestations"],
-        base_information_gain=0.92,
-        is_nodal=True,
-        nodal_weight=2.5
-    ),
-    "Q9": Question(
-        id="Q9",
-        text="Recurrent fever?",
-        answer_options=["No", "Yes"],
-        base_information_gain=1.15,
-        is_nodal=True,
-        nodal_weight=2.8  # High weight for autoinflammatory
-    ),
-    "Q15": Question(
-        id="Q15",
-        text="What is the PRIMARY type of pathogen causing infections?",
-        answer_options=["Fungi", "Bacteria", "Virus", "Mycobacteria", "Parasite", "None/Non_infectious"],
-        base_information_gain=2.95,
-        is_nodal=True,
-        nodal_weight=3.5  # Highest nodal weight
-    ),
-    "Q1": Question(
-        id="Q1",
-        text="Age at onset?",
-        answer_options=["<6mo", "6mo-5yr", "5-12yr", "12+_years"],
-        base_information_gain=2.35,
-        is_nodal=True,
-        nodal_weight=3.2
-    ),
-    "Q12": Question(
-        id="Q12",
-        text="Dysgammaglobulinemia?",
-        answer_options=["Normal", "Hypogammaglobulinemia", "Hypergammaglobulinemia", "Specific_Deficiency"],
-        base_information_gain=2.05,
-        is_nodal=True,
-        nodal_weight=3.0
-    ),
-    "Q5": Question(
-        id="Q5",
-        text="Adverse reaction to vaccine(s)? BCG, MMR, VZV, Polio",
-        answer_options=["No", "Yes_BCG", "Yes_Viral", "Yes_Multiple"],
-        base_information_gain=1.55,
-        is_nodal=True,
-        nodal_weight=2.9
-    ),
-    "Q17": Question(
-        id="Q17",
-        text="Cytopenias?",
-        answer_options=["None", "Thrombocytopenia", "Neutropenia", "Lymphopenia", "Multiple"],
-        base_information_gain=1.65,
-        is_nodal=True,
-        nodal_weight=2.6
-    ),
-    "Q16": Question(
-        id="Q16",
-        text="Multiple different pathogen types (e.g., bacteria AND fungi)?",
-        answer_options=["No_single_type", "Yes_two_types", "Yes_three_or_more"],
-        base_information_gain=1.25,
-        is_nodal=False
-    ),
+    ("Q3", "Recurrent infections?",
+     ("Yes_single_pathogen", "Yes_multiple_pathogens", "Non_infectious_manifestations"), 0.92, True, 2.5),
+    ("Q9", "Recurrent fever?",
+     ("No", "Yes"), 1.15, True, 2.8),  # High weight for autoinflammatory
+    ("Q15", "What is the PRIMARY type of pathogen causing infections?",
+     ("Fungi", "Bacteria", "Virus", "Mycobacteria", "Parasite", "None/Non_infectious"), 2.95, True, 3.5),  # Highest nodal weight
+    ("Q1", "Age at onset?",
+     ("<6mo", "6mo-5yr", "5-12yr", "12+_years"), 2.35, True, 3.2),
+    ("Q12", "Dysgammaglobulinemia?",
+     ("Normal", "Hypogammaglobulinemia", "Hypergammaglobulinemia", "Specific_Deficiency"), 2.05, True, 3.0),
+    ("Q5", "Adverse reaction to vaccine(s)? BCG, MMR, VZV, Polio",
+     ("No", "Yes_BCG", "Yes_Viral", "Yes_Multiple"), 1.55, True, 2.9),
+    ("Q17", "Cytopenias?",
+     ("None", "Thrombocytopenia", "Neutropenia", "Lymphopenia", "Multiple"), 1.65, True, 2.6),
+    ("Q16", "Multiple different pathogen types (e.g., bacteria AND fungi)?",
+     ("No_single_type", "Yes_two_types", "Yes_three_or_more"), 1.25, False, 1.0),
     
     # Batch 1: High-value questions from original 35
-    "Q2": Question(
-        id="Q2",
-        text="Bleeding tendency? (Petechiae, epistaxis, easy bruising, bloody diarrhea, melena)",
-        answer_options=["No", "Yes_mild", "Yes_severe"],
-        base_information_gain=0.88,
-        is_nodal=False
-    ),
-    "Q6": Question(
-        id="Q6",
-        text="Sex of the patient?",
-        answer_options=["Male", "Female"],
-        base_information_gain=0.18,
-        is_nodal=False
-    ),
-    "Q7": Question(
-        id="Q7",
-        text="History of eczema or rash?",
-        answer_options=["No", "Yes_mild", "Yes_severe"],
-        base_information_gain=0.98,
-        is_nodal=False
-    ),
-    "Q11": Question(
-        id="Q11",
-        text="Lymphoproliferation? (Hepatomegaly, splenomegaly, lymphadenopathy)",
-        answer_options=["No", "Yes_one_site", "Yes_multiple_sites"],
-        base_information_gain=1.25,
-        is_nodal=False
-    ),
-    "Q13": Question(
-        id="Q13",
-        text="Congenital malformation(s)?",
-        answer_options=["No", "Yes_cardiac", "Yes_skeletal", "Yes_other", "Yes_multiple"],
-        base_information_gain=0.78,
-        is_nodal=False
-    ),
-    "Q14": Question(
-        id="Q14",
-        text="Dysmorphism or peculiar facies?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.82,
-        is_nodal=False
-    ),
-    "Q18": Question(
-        id="Q18",
-        text="Polycythemia/hypercellularity? (Leukocytosis, eosinophilia, neutrophilia, thrombocytosis)",
-        answer_options=["No", "Yes_eosinophilia", "Yes_leukocytosis", "Yes_other"],
-        base_information_gain=0.72,
-        is_nodal=False
-    ),
-    "Q19": Question(
-        id="Q19",
-        text="Silver hair or hypopigmentation?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.58,
-        is_nodal=False
-    ),
-    "Q20": Question(
-        id="Q20",
-        text="Dystrophic nails?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.42,
-        is_nodal=False
-    ),
-    "Q21": Question(
-        id="Q21",
-        text="Alopecia or vitiligo?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.52,
-        is_nodal=False
-    ),
+    ("Q2", "Bleeding tendency? (Petechiae, epistaxis, easy bruising, bloody diarrhea, melena)",
+     ("No", "Yes_mild", "Yes_severe"), 0.88, False, 1.0),
+    ("Q6", "Sex of the patient?",
+     ("Male", "Female"), 0.18, False, 1.0),
+    ("Q7", "History of eczema or rash?",
+     ("No", "Yes_mild", "Yes_severe"), 0.98, False, 1.0),
+    ("Q11", "Lymphoproliferation? (Hepatomegaly, splenomegaly, lymphadenopathy)",
+     ("No", "Yes_one_site", "Yes_multiple_sites"), 1.25, False, 1.0),
+    ("Q13", "Congenital malformation(s)?",
+     ("No", "Yes_cardiac", "Yes_skeletal", "Yes_other", "Yes_multiple"), 0.78, False, 1.0),
+    ("Q14", "Dysmorphism or peculiar facies?",
+     ("No", "Yes"), 0.82, False, 1.0),
+    ("Q18", "Polycythemia/hypercellularity? (Leukocytosis, eosinophilia, neutrophilia, thrombocytosis)",
+     ("No", "Yes_eosinophilia", "Yes_leukocytosis", "Yes_other"), 0.72, False, 1.0),
+    ("Q19", "Silver hair or hypopigmentation?",
+     ("No", "Yes"), 0.58, False, 1.0),
+    ("Q20", "Dystrophic nails?",
+     ("No", "Yes"), 0.42, False, 1.0),
+    ("Q21", "Alopecia or vitiligo?",
+     ("No", "Yes"), 0.52, False, 1.0),
     
     # Batch 2: Pathognomonic markers and severity indicators from original 35
-    "Q22": Question(
-        id="Q22",
-        text="Warts or molluscum contagiosum?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.68,
-        is_nodal=False
-    ),
-    "Q23": Question(
-        id="Q23",
-        text="Ataxia? Telangiectasia?",
-        answer_options=["No", "Yes_ataxia", "Yes_telangiectasia", "Yes_both"],
-        base_information_gain=0.52,
-        is_nodal=False
-    ),
-    "Q24": Question(
-        id="Q24",
-        text="Bronchiectases?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.98,
-        is_nodal=False
-    ),
-    "Q25": Question(
-        id="Q25",
-        text="Complicated pneumonia? (Empyema, lung abscess, necrotizing)",
-        answer_options=["No", "Yes"],
-        base_information_gain=1.20,
-        is_nodal=False
-    ),
-    "Q26": Question(
-        id="Q26",
-        text="Arthritis?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.48,
-        is_nodal=False
-    ),
-    "Q27": Question(
-        id="Q27",
-        text="Autoimmunity? (Lupus, vasculitis, serum autoantibodies)",
-        answer_options=["No", "Yes_organ_specific", "Yes_systemic"],
-        base_information_gain=0.92,
-        is_nodal=False
-    ),
-    "Q28": Question(
-        id="Q28",
-        text="HLH (hemophagocytic lymphohistiocytosis)?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.72,
-        is_nodal=False
-    ),
-    "Q29": Question(
-        id="Q29",
-        text="Intensive care unit admission?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.62,
-        is_nodal=False
-    ),
-    "Q30": Question(
-        id="Q30",
-        text="Neurologic deficit? Developmental delay?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.58,
-        is_nodal=False
-    ),
-    "Q31": Question(
-        id="Q31",
-        text="Inflammatory bowel disease?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.78,
-        is_nodal=False
-    ),
-    "Q32": Question(
-        id="Q32",
-        text="Anhidrotic ectodermal dysplasia?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.38,
-        is_nodal=False
-    ),
-    "Q33": Question(
-        id="Q33",
-        text="Absent thymic shadow? Hypoplastic thymus?",
-        answer_options=["No", "Yes"],
-        base_information_gain=1.35,
-        is_nodal=False
-    ),
-    "Q34": Question(
-        id="Q34",
-        text="Severe atopy?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.88,
-        is_nodal=False
-    ),
-    "Q35": Question(
-        id="Q35",
-        text="Lymphoma? Malignancy?",
-        answer_options=["No", "Yes"],
-        base_information_gain=0.62,
-        is_nodal=False
-    ),
+    ("Q22", "Warts or molluscum contagiosum?",
+     ("No", "Yes"), 0.68, False, 1.0),
+    ("Q23", "Ataxia? Telangiectasia?",
+     ("No", "Yes_ataxia", "Yes_telangiectasia", "Yes_both"), 0.52, False, 1.0),
+    ("Q24", "Bronchiectases?",
+     ("No", "Yes"), 0.98, False, 1.0),
+    ("Q25", "Complicated pneumonia? (Empyema, lung abscess, necrotizing)",
+     ("No", "Yes"), 1.20, False, 1.0),
+    ("Q26", "Arthritis?",
+     ("No", "Yes"), 0.48, False, 1.0),
+    ("Q27", "Autoimmunity? (Lupus, vasculitis, serum autoantibodies)",
+     ("No", "Yes_organ_specific", "Yes_systemic"), 0.92, False, 1.0),
+    ("Q28", "HLH (hemophagocytic lymphohistiocytosis)?",
+     ("No", "Yes"), 0.72, False, 1.0),
+    ("Q29", "Intensive care unit admission?",
+     ("No", "Yes"), 0.62, False, 1.0),
+    ("Q30", "Neurologic deficit? Developmental delay?",
+     ("No", "Yes"), 0.58, False, 1.0),
+    ("Q31", "Inflammatory bowel disease?",
+     ("No", "Yes"), 0.78, False, 1.0),
+    ("Q32", "Anhidrotic ectodermal dysplasia?",
+     ("No", "Yes"), 0.38, False, 1.0),
+    ("Q33", "Absent thymic shadow? Hypoplastic thymus?",
+     ("No", "Yes"), 1.35, False, 1.0),
+    ("Q34", "Severe atopy?",
+     ("No", "Yes"), 0.88, False, 1.0),
+    ("Q35", "Lymphoma? Malignancy?",
+     ("No", "Yes"), 0.62, False, 1.0),
     
     # Additional high-IG questions (top 10)
-    "Q4": Question(
-        id="Q4",
-        text="Infection site(s)?",
-        answer_options=["Sinopulmonary", "Skin_soft_tissue", "Invasive_deep", "Disseminated_multiple"],
-        base_information_gain=1.85,
-        is_nodal=False
-    ),
-    "Q10": Question(
-        id="Q10",
-        text="Chronic mucocutaneous candidiasis?",
-        answer_options=["No", "Yes"],
-        base_information_gain=1.50,
-        is_nodal=False
-    ),
-    "Q8": Question(
-        id="Q8",
-        text="History of Abscesses?",
-        answer_options=["No", "Yes"],
-        base_information_gain=1.40,
-        is_nodal=False
-    ),
+    ("Q4", "Infection site(s)?",
+     ("Sinopulmonary", "Skin_soft_tissue", "Invasive_deep", "Disseminated_multiple"), 1.85, False, 1.0),
+    ("Q10", "Chronic mucocutaneous candidiasis?",
+     ("No", "Yes"), 1.50, False, 1.0),
+    ("Q8", "History of Abscesses?",
+     ("No", "Yes"), 1.40, False, 1.0),
+)
+
+# Read-only view: the question set is fixed after import, so lookups can be
+# cached (QUESTION_IDS, QUESTION_INDEX and the column arrays below rely on it).
+# Built eagerly: every record is read at import by the column arrays and the
+# option-code tables, so a lazy mapping would not skip any construction.
+QUESTIONS = MappingProxyType({row[0]: Question(row[0], *row[2:]) for row in _QUESTION_TABLE})
+
+# Question wording is only needed for display, so it is packed into one UTF-8
+# blob (in QUESTIONS order) instead of being held by every Question record
+_text_bytes = [row[1].encode('utf-8') for row in _QUESTION_TABLE]
+QUESTION_TEXT_BLOB = b''.join(_text_bytes)
+QUESTION_TEXT_OFFSETS = np.cumsum([0] + [len(text) for text in _text_bytes]).astype(np.uint16)
+assert QUESTION_TEXT_OFFSETS[-1] == len(QUESTION_TEXT_BLOB), "question text exceeds uint16 offsets"
+QUESTION_TEXT_OFFSETS.setflags(write=False)
+del _text_bytes, _QUESTION_TABLE
+
+def get_question_text(question_id: str) -> str:
+    """Display text of a question"""
+    i = QUESTION_INDEX[question_id]
+    start, end = QUESTION_TEXT_OFFSETS[i], QUESTION_TEXT_OFFSETS[i + 1]
+    return QUESTION_TEXT_BLOB[start:end].decode('utf-8')
+
+# ============================================================================
+# QUESTION TABLES - Structure-of-arrays view of QUESTIONS
+# ============================================================================
+
+# Question order matches QUESTIONS so ties resolve the same way as a dict scan
+QUESTION_IDS = tuple(QUESTIONS.keys())
+QUESTION_INDEX = {q_id: i for i, q_id in enumerate(QUESTION_IDS)}
+
+# Per-question columns aligned to QUESTION_IDS. Weights are kept in float64
+# since they scale the information gains compared during question selection.
+QUESTION_BASE_IG = np.array(
+    [QUESTIONS[q_id].base_information_gain for q_id in QUESTION_IDS], dtype=np.float64
+)
+QUESTION_IS_NODAL = np.array(
+    [QUESTIONS[q_id].is_nodal for q_id in QUESTION_IDS], dtype=np.bool_
+)
+QUESTION_NODAL_WEIGHT = np.array(
+    [QUESTIONS[q_id].nodal_weight for q_id in QUESTION_IDS], dtype=np.float64
+)
+QUESTION_N_OPTIONS = np.fromiter(
+    (len(QUESTIONS[q_id].answer_options) for q_id in QUESTION_IDS),
+    dtype=np.uint8,
+    count=len(QUESTION_IDS)
+)
+
+# Nodal weight with the is_nodal branch resolved once (1.0 for non-nodal questions)
+QUESTION_NODAL_MULTIPLIER = np.where(QUESTION_IS_NODAL, QUESTION_NODAL_WEIGHT, 1.0)
+
+# Static (prior-independent) ranking: base IG scaled by the nodal multiplier
+QUESTION_EFFECTIVE_IG = QUESTION_BASE_IG * QUESTION_NODAL_MULTIPLIER
+QUESTION_IG_RANK_ORDER = np.argsort(-QUESTION_EFFECTIVE_IG, kind='stable')
+
+for _column in (
+    QUESTION_BASE_IG, QUESTION_IS_NODAL, QUESTION_NODAL_WEIGHT, QUESTION_N_OPTIONS,
+    QUESTION_NODAL_MULTIPLIER, QUESTION_EFFECTIVE_IG, QUESTION_IG_RANK_ORDER
+):
+    _column.setflags(write=False)
+
+# Nodal (category-routing) subset, in QUESTION_IDS order
+NODAL_INDICES = np.flatnonzero(QUESTION_IS_NODAL).astype(np.int32)
+NODAL_INDICES.setflags(write=False)
+
+# Nodal questions as a bitmask over QUESTION_IDS positions (same layout as
+# IEIDiagnosticEngine.asked_mask), so nodal counts are a single popcount
+NODAL_QUESTION_MASK = sum(1 << i for i in NODAL_INDICES.tolist())
+assert len(QUESTION_IDS) <= 64, "question bitmasks assume at most 64 questions"
+
+# Every question set: asked_mask == ALL_QUESTIONS_MASK means none are left
+ALL_QUESTIONS_MASK = (1 << len(QUESTION_IDS)) - 1
+
+# Bit value of each QUESTION_IDS position, for unpacking question bitmasks
+QUESTION_BITS = np.left_shift(1, np.arange(len(QUESTION_IDS), dtype=np.uint64))
+QUESTION_BITS.setflags(write=False)
+
+def asked_array(asked_mask: int) -> np.ndarray:
+    """Unpack a question bitmask into a bool array aligned to QUESTION_IDS"""
+    return (QUESTION_BITS & np.uint64(asked_mask)) != 0
+
+# (bit, question_id) pairs in QUESTION_IG_RANK_ORDER for greedy static selection
+STATIC_RANKING = tuple(
+    (1 << i, QUESTION_IDS[i]) for i in QUESTION_IG_RANK_ORDER.tolist()
+)
+
+def total_effective_ig(asked_mask: int) -> float:
+    """Summed QUESTION_EFFECTIVE_IG of the questions set in a bitmask"""
+    if masked_sum is not None:
+        return masked_sum(np.uint64(asked_mask), QUESTION_EFFECTIVE_IG)
+    return float(QUESTION_EFFECTIVE_IG[asked_array(asked_mask)].sum())
+
+def select_static_question(asked_mask: int) -> Optional[str]:
+    """
+    Unasked question with the highest prior-independent effective IG
+    
+    Ranks by QUESTION_EFFECTIVE_IG only, without the posterior-dependent
+    information gain used by select_next_question; ties go to QUESTION_IDS order.
+    Walks the precomputed ranking, so it stops at the first unasked question.
+    """
+    for bit, q_id in STATIC_RANKING:
+        if not asked_mask & bit:
+            return q_id
+    return None
+
+# Answer option <-> small integer code, in answer_options order per question
+OPTION_CODE = {
+    q_id: {option: code for code, option in enumerate(question.answer_options)}
+    for q_id, question in QUESTIONS.items()
 }
+OPTION_NAME = tuple(tuple(QUESTIONS[q_id].answer_options) for q_id in QUESTION_IDS)
+
+def encode_answer(question_id: str, answer: str) -> int:
+    """Option code of an answer, or -1 if it is not one of the question's options"""
+    return OPTION_CODE.get(question_id, {}).get(answer, -1)
+
+# One-hot answer layout: question i owns columns OPTION_OFFSETS[i]:OPTION_OFFSETS[i + 1]
+OPTION_OFFSETS = np.concatenate(([0], np.cumsum(QUESTION_N_OPTIONS))).astype(np.int32)
+OPTION_OFFSETS.setflags(write=False)
+N_OPTION_FEATURES = int(OPTION_OFFSETS[-1])
+
+# All option strings as one UTF-8 blob in one-hot column order; option f spans
+# OPTION_BYTE_OFFSETS[f]:OPTION_BYTE_OFFSETS[f + 1]
+_option_bytes = [option.encode('utf-8') for options in OPTION_NAME for option in options]
+OPTION_BLOB = b''.join(_option_bytes)
+OPTION_BYTE_OFFSETS = np.cumsum([0] + [len(option) for option in _option_bytes]).astype(np.uint16)
+assert OPTION_BYTE_OFFSETS[-1] == len(OPTION_BLOB), "option text exceeds uint16 offsets"
+OPTION_BYTE_OFFSETS.setflags(write=False)
+del _option_bytes
+
+def is_valid_option_code(question_id: str, code: int) -> bool:
+    """Whether code is an option code of the question (no string comparison)"""
+    return 0 <= code < int(QUESTION_N_OPTIONS[QUESTION_INDEX[question_id]])
+
+def get_option(question_id: str, code: int) -> str:
+    """Answer option string for an option code, decoded from OPTION_BLOB"""
+    f = OPTION_OFFSETS[QUESTION_INDEX[question_id]] + code
+    return OPTION_BLOB[OPTION_BYTE_OFFSETS[f]:OPTION_BYTE_OFFSETS[f + 1]].decode('utf-8')
+
+def answer_feature_index(question_id: str, answer: str) -> int:
+    """Column of an answer in the one-hot answer layout, or -1 if unknown"""
+    code = encode_answer(question_id, answer)
+    if code < 0:
+        return -1
+    return int(OPTION_OFFSETS[QUESTION_INDEX[question_id]]) + code
+
+def encode_answer_features(sessions: List[Dict[str, str]]) -> np.ndarray:
+    """
+    One-hot encode the answers of several patients
+    
+    Args:
+        sessions: One {question_id: answer} dict per patient
+    
+    Returns:
+        (len(sessions), N_OPTION_FEATURES) uint8 matrix; unknown answers are skipped
+    """
+    rows, cols = [], []
+    for row, answers in enumerate(sessions):
+        for q_id, answer in answers.items():
+            col = answer_feature_index(q_id, answer)
+            if col >= 0:
+                rows.append(row)
+                cols.append(col)
+    features = np.zeros((len(sessions), N_OPTION_FEATURES), dtype=np.uint8)
+    features[rows, cols] = 1
+    return features
+
+def question_indices(question_ids: List[str]) -> np.ndarray:
+    """Positions of the given questions in QUESTION_IDS, as an index array"""
+    return np.fromiter(
+        (QUESTION_INDEX[q_id] for q_id in question_ids),
+        dtype=np.intp,
+        count=len(question_ids)
+    )
+
+# Numeric question columns packed as one record per question (in QUESTION_IDS
+# order) for storage or sharing between worker processes
+QUESTION_RECORD_DTYPE = np.dtype([
+    ('ig', '<f4'),     # base_information_gain
+    ('nw', '<f4'),     # nodal_weight
+    ('nodal', '?'),    # is_nodal
+    ('nopt', 'u1'),    # number of answer options
+])
+
+def question_records() -> np.ndarray:
+    """Structured array of the numeric question columns"""
+    records = np.empty(len(QUESTION_IDS), dtype=QUESTION_RECORD_DTYPE)
+    records['ig'] = QUESTION_BASE_IG
+    records['nw'] = QUESTION_NODAL_WEIGHT
+    records['nodal'] = QUESTION_IS_NODAL
+    records['nopt'] = QUESTION_N_OPTIONS
+    return records
+
+def save_question_arrays(path: str):
+    """Write question_records() to a .npy file"""
+    np.save(path, question_records())
+
+def load_question_arrays(path: str) -> np.ndarray:
+    """
+    Memory-map a .npy file written by save_question_arrays
+    
+    Worker processes mapping the same file share its pages through the OS
+    page cache. Records are positional (question IDs are not stored), so
+    only the record layout and the question count are checked: raises
+    ValueError if either does not match QUESTION_IDS.
+    """
+    records = np.load(path, mmap_mode='r')
+    if records.dtype != QUESTION_RECORD_DTYPE or records.shape != (len(QUESTION_IDS),):
+        raise ValueError(f"{path} does not match the current question table")
+    return records
+
+def questions_to_blob() -> bytes:
+    """Pack the numeric question columns into bytes (IDs are positional)"""
+    return question_records().tobytes()
+
+def questions_from_blob(blob: bytes) -> np.ndarray:
+    """Read-only record view of a questions_to_blob() buffer"""
+    if len(blob) != len(QUESTION_IDS) * QUESTION_RECORD_DTYPE.itemsize:
+        raise ValueError("Question blob does not match the current question table")
+    return np.frombuffer(blob, dtype=QUESTION_RECORD_DTYPE)
 
 # ============================================================================
 # FERMI ESTIMATIONS - Probability Distributions
 # These are expert-derived estimates based on IUIS 2024 + ESID registry
 # ============================================================================
 
+# Prior P(category), built once; see initialize_prior_probabilities
+PRIOR_PROBABILITIES = MappingProxyType({
+    'Antibody_Deficiency': 0.15,   # DOWN from 0.25 - equal footing
+    'Combined_ID': 0.15,           # Same - critical early detection
+    'Phagocyte_Defect': 0.15,      # Same - common presentations
+    'Immune_Dysregulation': 0.13,  # UP from 0.12 - increasingly recognized
+    'Autoinflammatory': 0.12,      # UP from 0.10 - common in clinic
+    'Innate_Immunity': 0.12,       # UP from 0.10 - regionally important
+    'Complement_Deficiency': 0.10, # UP from 0.08 - underdiagnosed
+    'Bone_Marrow_Failure': 0.08    # UP from 0.05 - rare but critical
+})
+
+# Same priors as a read-only vector aligned to IEI_CATEGORIES
+PRIOR_VECTOR = np.array([PRIOR_PROBABILITIES[cat] for cat in IEI_CATEGORIES], dtype=np.float64)
+PRIOR_VECTOR.setflags(write=False)
+
 def initialize_prior_probabilities() -> Dict[str, float]:
     """
     Initialize prior probabilities for each IEI category
@@ -582,17 +733,11 @@ def initialize_prior_probabilities() -> Dict[str, float]:
     
     These priors reflect a patient already referred for IEI evaluation with
     sufficient clinical suspicion to warrant comprehensive diagnostic workup.
+    
+    Returns a fresh mutable copy of PRIOR_PROBABILITIES; read-only callers
+    can use PRIOR_PROBABILITIES or PRIOR_VECTOR directly.
     """
-    return {
-        'Antibody_Deficiency': 0.15,   # DOWN from 0.25 - equal footing
-        'Combined_ID': 0.15,           # Same - critical early detection
-        'Phagocyte_Defect': 0.15,      # Same - common presentations
-        'Immune_Dysregulation': 0.13,  # UP from 0.12 - increasingly recognized
-        'Autoinflammatory': 0.12,      # UP from 0.10 - common in clinic
-        'Innate_Immunity': 0.12,       # UP from 0.10 - regionally important
-        'Complement_Deficiency': 0.10, # UP from 0.08 - underdiagnosed
-        'Bone_Marrow_Failure': 0.08    # UP from 0.05 - rare but critical
-    }
+    return dict(PRIOR_PROBABILITIES)
 
 # Conditional probabilities: P(Answer | Category)
 # Format: QUESTION_ID -> Answer -> {Category: Probability}
@@ -1724,23 +1869,401 @@ CONDITIONAL_PROBABILITIES = {
 }
 
 # ============================================================================
-# SHANNON ENTROPY CALCULATIONS
+# VECTORIZED LIKELIHOOD TABLES
 # ============================================================================
 
-def calculate_entropy(probabilities: Dict[str, float]) -> float:
+def build_likelihood_tensor(
+    question_ids: List[str],
+    conditional_probs: Dict[str, Dict[str, Dict[str, float]]],
+    dtype: type = np.float32
+) -> np.ndarray:
     """
-    Calculate Shannon entropy: H(X) = -Σ p(x) * log2(p(x))
+    Stack P(answer | category) tables into a dense (Q, A, C) tensor
+    
+    Answers are laid out in table order and categories in IEI_CATEGORIES
+    order. Questions with fewer answers (or no table at all) are zero-padded,
+    and all-zero rows drop out of every marginal computed from the tensor.
+    
+    Stored as float32 by default, for the information gain scan: the tables
+    are expert estimates with 3 decimals. Posterior-side tables are built
+    in float64 (see LIKELIHOOD_TENSOR_F64).
     
     Args:
-        probabilities: Dictionary of {category: probability}
+        question_ids: Questions to include, in output order
+        conditional_probs: Conditional probability tables
+        dtype: Element type (float64 where exact table values matter)
+    
+    Returns:
+        Array of shape (len(question_ids), max_answers, len(IEI_CATEGORIES))
+    """
+    tables = [conditional_probs.get(q_id, {}) for q_id in question_ids]
+    max_answers = max((len(table) for table in tables), default=0)
+    tensor = np.zeros((len(question_ids), max_answers, len(IEI_CATEGORIES)), dtype=dtype)
+    for q, table in enumerate(tables):
+        for a, answer_probs in enumerate(table.values()):
+            tensor[q, a] = [answer_probs.get(cat, 0) for cat in IEI_CATEGORIES]
+    return tensor
+
+LIKELIHOOD_TENSOR = build_likelihood_tensor(QUESTION_IDS, CONDITIONAL_PROBABILITIES)
+
+# The same tables in float64, for everything that moves the posterior
+# (updates, batch and cohort scoring). float32 rounding shifts posteriors by
+# ulps, which is enough to reorder near-tied leading categories and with them
+# the relevance weights and the next question.
+LIKELIHOOD_TENSOR_F64 = build_likelihood_tensor(
+    QUESTION_IDS, CONDITIONAL_PROBABILITIES, dtype=np.float64
+)
+
+# Answer -> row position in LIKELIHOOD_TENSOR for each question; keys are
+# interned like Question.answer_options, so option strings match by identity
+ANSWER_INDEX = {
+    q_id: {sys.intern(answer): a for a, answer in enumerate(CONDITIONAL_PROBABILITIES.get(q_id, {}))}
+    for q_id in QUESTION_IDS
+}
+
+# The module tables list every category for every answer (no implicit zeros),
+# so the .get(cat, 0) defaults in build_likelihood_tensor never apply to them
+assert all(
+    answer_probs.keys() == CATEGORY_INDEX.keys()
+    for table in CONDITIONAL_PROBABILITIES.values()
+    for answer_probs in table.values()
+), "every conditional probability row must list exactly the IEI_CATEGORIES"
+
+# Every answer row is a distribution over categories; catch table typos at import.
+# Padding rows (answers a question doesn't have) must stay all-zero.
+_row_sums = LIKELIHOOD_TENSOR_F64.sum(axis=2)
+_real_rows = np.arange(LIKELIHOOD_TENSOR_F64.shape[1]) < np.array(
+    [len(ANSWER_INDEX[q_id]) for q_id in QUESTION_IDS]
+)[:, None]
+assert np.all(np.abs(_row_sums[_real_rows] - 1.0) < 0.01), \
+    "conditional probability rows must sum to 1 (within 1%)"
+assert np.all(_row_sums[~_real_rows] == 0), "padding rows must be zero"
+del _row_sums, _real_rows
+
+# log P(answer | category), precomputed so updates never call log() per answer;
+# zero (padding) entries map to -inf
+with np.errstate(divide='ignore'):
+    LOG_LIKELIHOOD_TENSOR = np.log(LIKELIHOOD_TENSOR_F64)
+
+# float64 log2 P(answer | category) for best_weighted_question; padding
+# entries are -inf and never read
+with np.errstate(divide='ignore'):
+    LOG2_LIKELIHOOD_TENSOR = np.log2(LIKELIHOOD_TENSOR, dtype=np.float64)
+
+# Log of the flattened prior, aligned to IEI_CATEGORIES
+LOG_PRIOR = np.log(PRIOR_VECTOR)
+
+# Shared by every engine (and every Streamlit session) - never mutate in place
+LIKELIHOOD_TENSOR.setflags(write=False)
+LIKELIHOOD_TENSOR_F64.setflags(write=False)
+LOG_LIKELIHOOD_TENSOR.setflags(write=False)
+LOG2_LIKELIHOOD_TENSOR.setflags(write=False)
+LOG_PRIOR.setflags(write=False)
+
+def _deduplicate_rows(tensor: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collapse identical answer rows of a likelihood tensor
+    
+    Returns:
+        (unique rows in first-seen order, (Q, A) int16 row ids with -1 at padding)
+    """
+    row_id = {}
+    unique_rows = []
+    ids = np.full(tensor.shape[:2], -1, dtype=np.int16)
+    for q, answers in enumerate(ANSWER_INDEX[q_id] for q_id in QUESTION_IDS):
+        for a in answers.values():
+            key = tensor[q, a].tobytes()
+            if key not in row_id:
+                row_id[key] = len(unique_rows)
+                unique_rows.append(tensor[q, a])
+            ids[q, a] = row_id[key]
+    rows = np.array(unique_rows, dtype=tensor.dtype).reshape(-1, tensor.shape[2])
+    return rows, ids
+
+# Exact-duplicate answer rows (e.g. the Q13/Q14 "no evidence" rows) stored once;
+# LIKELIHOOD_ROW_ID[q, a] indexes UNIQUE_LIKELIHOOD_ROWS
+UNIQUE_LIKELIHOOD_ROWS, LIKELIHOOD_ROW_ID = _deduplicate_rows(LIKELIHOOD_TENSOR_F64)
+UNIQUE_LIKELIHOOD_ROWS.setflags(write=False)
+LIKELIHOOD_ROW_ID.setflags(write=False)
+
+# Flat 2-D view of the tables: (question_id, answer) -> UNIQUE_LIKELIHOOD_ROWS
+# row, so batch code can gather with one integer index instead of ragged (q, a)
+QA_ROW = {
+    (q_id, answer): int(LIKELIHOOD_ROW_ID[QUESTION_INDEX[q_id], a])
+    for q_id, answers in ANSWER_INDEX.items()
+    for answer, a in answers.items()
+}
+
+# log of UNIQUE_LIKELIHOOD_ROWS (all entries are positive)
+LOG_LIKELIHOOD_ROWS = np.log(UNIQUE_LIKELIHOOD_ROWS)
+LOG_LIKELIHOOD_ROWS.setflags(write=False)
+
+# (question_id, answer) -> read-only shared row, one probe per lookup;
+# duplicate rows are views of the same memory
+FLAT_LIKELIHOOD = {qa: UNIQUE_LIKELIHOOD_ROWS[row] for qa, row in QA_ROW.items()}
+
+# Answer names by LIKELIHOOD_TENSOR position, per QUESTION_IDS position
+TABLE_ANSWERS = tuple(tuple(ANSWER_INDEX[q_id]) for q_id in QUESTION_IDS)
+
+# Inverted index for explanations: per category, every (question, answer)
+# row ordered by P(answer | category), highest first
+EVIDENCE_DTYPE = np.dtype([('prob', 'f4'), ('q', 'u1'), ('a', 'u1')])
+
+def _build_evidence_index() -> Dict[str, np.ndarray]:
+    rows = np.array(
+        [(0.0, q, a) for q, answers in enumerate(TABLE_ANSWERS) for a in range(len(answers))],
+        dtype=EVIDENCE_DTYPE
+    )
+    index = {}
+    for c, cat in enumerate(IEI_CATEGORIES):
+        entries = rows.copy()
+        entries['prob'] = LIKELIHOOD_TENSOR[entries['q'], entries['a'], c]
+        entries = entries[np.argsort(-entries['prob'], kind='stable')]
+        entries.setflags(write=False)
+        index[cat] = entries
+    return index
+
+EVIDENCE_FOR = _build_evidence_index()
+
+def top_evidence(category: str, k: int = 5) -> List[Tuple[str, str, float]]:
+    """
+    Answers that most support a category
+    
+    Returns:
+        Up to k (question_id, answer, P(answer | category)) tuples, highest first
+    """
+    return [
+        (QUESTION_IDS[q], TABLE_ANSWERS[q][a], round(prob, 4))  # tables have <= 3 decimals
+        for prob, q, a in EVIDENCE_FOR[category][:k].tolist()
+    ]
+
+def get_likelihood(question_id: str, answer: str) -> Optional[np.ndarray]:
+    """
+    P(answer | category) vector aligned to IEI_CATEGORIES
+    
+    Returns a read-only view of a UNIQUE_LIKELIHOOD_ROWS row (identical to
+    the LIKELIHOOD_TENSOR_F64 row), or None if the question or answer has no
+    conditional probability table.
+    """
+    return FLAT_LIKELIHOOD.get((question_id, answer))
+
+def get_static_tables() -> Dict[str, object]:
+    """
+    Immutable lookup tables shared by all IEIDiagnosticEngine instances
+    
+    Returned as keyword arguments for IEIDiagnosticEngine(...), so a host
+    application can build them once and hand the same objects to every session.
+    """
+    return {
+        'likelihoods': LIKELIHOOD_TENSOR,
+        'log_likelihoods': LOG_LIKELIHOOD_TENSOR,
+        'question_index': QUESTION_INDEX,
+        'answer_index': ANSWER_INDEX,
+    }
+
+def encode_table_answers(answers: Dict[str, str]) -> np.ndarray:
+    """
+    Row of LIKELIHOOD_TENSOR answer positions for one patient
+    
+    Args:
+        answers: {question_id: answer} dict
+    
+    Returns:
+        int8 array aligned to QUESTION_IDS; -1 where the question is unanswered
+        or the answer has no conditional probability table
+    """
+    row = np.full(len(QUESTION_IDS), -1, dtype=np.int8)
+    for q_id, answer in answers.items():
+        answer_idx = ANSWER_INDEX.get(q_id, {}).get(answer)
+        if answer_idx is not None:
+            row[QUESTION_INDEX[q_id]] = answer_idx
+    return row
+
+def score_patients(answer_matrix: np.ndarray) -> np.ndarray:
+    """
+    Unnormalized log-posteriors for a batch of patients in one gather
+    
+    log P(category | answers) ∝ log P(category) + Σ_q log P(answer_q | category)
+    
+    This is the plain naive-Bayes score for retrospective/cohort use: unlike
+    IEIDiagnosticEngine it applies no per-answer probability floor, so the
+    result does not depend on the order in which questions were asked.
+    
+    Args:
+        answer_matrix: (n_patients, len(QUESTION_IDS)) answer positions as
+            produced by encode_table_answers, -1 for unanswered
+    
+    Returns:
+        (n_patients, len(IEI_CATEGORIES)) float64 log scores
+    """
+    answer_matrix = np.asarray(answer_matrix)
+    answered = answer_matrix >= 0
+    rows = LOG_LIKELIHOOD_TENSOR[
+        np.arange(len(QUESTION_IDS)), np.where(answered, answer_matrix, 0)
+    ]
+    return LOG_PRIOR + np.where(answered[..., None], rows, 0.0).sum(axis=1, dtype=np.float64)
+
+def encode_table_rows(sessions: List[Dict[str, str]]) -> np.ndarray:
+    """
+    Count matrix of likelihood rows used by several patients
+    
+    Args:
+        sessions: One {question_id: answer} dict per patient
+    
+    Returns:
+        (len(sessions), len(UNIQUE_LIKELIHOOD_ROWS)) float64 matrix; entry
+        [p, r] counts the answers of patient p that map to QA_ROW r (answers
+        without a table are skipped)
+    """
+    rows, cols = [], []
+    for row, answers in enumerate(sessions):
+        for qa in answers.items():
+            col = QA_ROW.get(qa)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    counts = np.zeros((len(sessions), len(UNIQUE_LIKELIHOOD_ROWS)))
+    np.add.at(counts, (rows, cols), 1.0)
+    return counts
+
+def score_batch(row_counts: np.ndarray) -> np.ndarray:
+    """
+    score_patients as one matrix product against LOG_LIKELIHOOD_ROWS
+    
+    Args:
+        row_counts: (n_patients, len(UNIQUE_LIKELIHOOD_ROWS)) matrix from
+            encode_table_rows
+    
+    Returns:
+        (n_patients, len(IEI_CATEGORIES)) float64 unnormalized log scores
+    """
+    return LOG_PRIOR + row_counts @ LOG_LIKELIHOOD_ROWS
+
+TSV_COLUMNS = ('question', 'answer', 'category', 'prob')
+
+def export_conditional_probabilities_tsv(
+    path: str,
+    conditional_probs: Dict[str, Dict[str, Dict[str, float]]] = CONDITIONAL_PROBABILITIES
+):
+    """
+    Write conditional probability tables as long-format TSV for review
+    
+    One row per (question, answer, category) with the header TSV_COLUMNS,
+    in table order, so the values can be audited or edited in a spreadsheet.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\t'.join(TSV_COLUMNS) + '\n')
+        for q_id, answers in conditional_probs.items():
+            for answer, answer_probs in answers.items():
+                for cat, prob in answer_probs.items():
+                    f.write(f"{q_id}\t{answer}\t{cat}\t{prob!r}\n")
+
+def load_conditional_probabilities_tsv(path: str) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Read a TSV written by export_conditional_probabilities_tsv
+    
+    Returns nested {question: {answer: {category: prob}}} tables in file order,
+    usable anywhere CONDITIONAL_PROBABILITIES is (e.g. build_likelihood_tensor).
+    """
+    rows = np.genfromtxt(
+        path, delimiter='\t', names=True, dtype=None, encoding='utf-8', comments=None
+    )
+    tables = {}
+    for q_id, answer, cat, prob in rows.tolist():
+        tables.setdefault(q_id, {}).setdefault(answer, {})[cat] = prob
+    return tables
+
+def save_likelihood_tables(path: str):
+    """
+    Write the likelihood tensor and its index tables to an .npz archive
     
+    The tensor is stored in float64 (LIKELIHOOD_TENSOR_F64), with question,
+    answer and category names alongside, so load_likelihood_tables can
+    rebuild the lookup dicts without the Python table literals.
+    """
+    answer_question, answer_names = [], []
+    for q, q_id in enumerate(QUESTION_IDS):
+        for answer in ANSWER_INDEX[q_id]:
+            answer_question.append(q)
+            answer_names.append(answer)
+    np.savez(
+        path,
+        likelihoods=LIKELIHOOD_TENSOR_F64,
+        question_ids=np.array(QUESTION_IDS),
+        categories=np.array(IEI_CATEGORIES),
+        answer_question=np.array(answer_question, dtype=np.int32),
+        answer_names=np.array(answer_names)
+    )
+
+def load_likelihood_tables(path: str) -> Dict[str, object]:
+    """
+    Read tables written by save_likelihood_tables
+    
+    Returns the same keyword arguments as get_static_tables(). Raises
+    ValueError if the archive was built for a different category order.
+    """
+    with np.load(path) as data:
+        if data['categories'].tolist() != IEI_CATEGORIES:
+            raise ValueError(f"{path} does not match IEI_CATEGORIES")
+        likelihoods = data['likelihoods']
+        question_ids = data['question_ids'].tolist()
+        answer_index = {q_id: {} for q_id in question_ids}
+        for q, answer in zip(data['answer_question'].tolist(), data['answer_names'].tolist()):
+            answers = answer_index[question_ids[q]]
+            answers[answer] = len(answers)
+    
+    # As with the module tables: log-likelihoods for the posterior from the
+    # stored values, the scan tensor in LIKELIHOOD_TENSOR's dtype
+    with np.errstate(divide='ignore'):
+        log_likelihoods = np.log(likelihoods, dtype=np.float64)
+    likelihoods = likelihoods.astype(LIKELIHOOD_TENSOR.dtype)
+    likelihoods.setflags(write=False)
+    log_likelihoods.setflags(write=False)
+    return {
+        'likelihoods': likelihoods,
+        'log_likelihoods': log_likelihoods,
+        'question_index': {q_id: i for i, q_id in enumerate(question_ids)},
+        'answer_index': answer_index,
+    }
+
+# ============================================================================
+# SHANNON ENTROPY CALCULATIONS
+# ============================================================================
+
+def probabilities_to_array(probabilities: Dict[str, float]) -> np.ndarray:
+    """
+    Convert a {category: probability} dict into a contiguous float64 vector
+    aligned to IEI_CATEGORIES order
+    """
+    return np.array(
+        [probabilities.get(cat, 0.0) for cat in IEI_CATEGORIES],
+        dtype=np.float64
+    )
+
+def calculate_entropy(probabilities: Union[Mapping[str, float], np.ndarray]) -> float:
+    """
+    Calculate Shannon entropy: H(X) = -Σ p(x) * log2(p(x))
+
+    Plain-float loop with math.log2: for 8 categories this is several times
+    faster than NumPy's per-call dispatch. Batched entropies over the
+    likelihood tensor stay vectorized (see answer_posterior_entropies).
+
+    Args:
+        probabilities: Mapping of {category: probability} (dict, or a
+            read-only view such as PRIOR_PROBABILITIES) or a probability
+            vector aligned to IEI_CATEGORIES
+
     Returns:
         Entropy in bits
     """
+    if isinstance(probabilities, Mapping):
+        values = probabilities.values()
+    else:
+        values = np.asarray(probabilities, dtype=np.float64).ravel().tolist()
     entropy = 0.0
-    for prob in probabilities.values():
+    for prob in values:
         if prob > 0:  # Avoid log(0)
-            entropy -= prob * np.log2(prob)
+            entropy -= prob * log2(prob)
     return entropy
 
 def calculate_information_gain(
@@ -1761,34 +2284,103 @@ def calculate_information_gain(
     Returns:
         Information gain in bits
     """
-    current_entropy = calculate_entropy(current_probs)
-    
     if question_id not in conditional_probs:
         return 0.0
     
-    # Calculate expected posterior entropy
-    expected_posterior_entropy = 0.0
+    if conditional_probs is CONDITIONAL_PROBABILITIES:
+        # Module tables are prebuilt; slice the question's (1, A, C) block
+        q = QUESTION_INDEX[question_id]
+        likelihoods = LIKELIHOOD_TENSOR[q:q + 1]
+    else:
+        likelihoods = build_likelihood_tensor([question_id], conditional_probs)
+    prior = probabilities_to_array(current_probs)
+    return float(calculate_information_gain_batch(prior, likelihoods)[0])
+
+def answer_posterior_entropies(
+    prior: np.ndarray,
+    likelihoods: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Answer marginals and posterior entropies for every (question, answer) pair
     
-    for answer, answer_probs in conditional_probs[question_id].items():
-        # P(answer) = Σ P(answer|category) * P(category)
-        p_answer = sum(
-            answer_probs.get(cat, 0) * current_probs.get(cat, 0)
-            for cat in IEI_CATEGORIES
-        )
-        
-        if p_answer > 0:
-            # Calculate posterior: P(category|answer)
-            posterior = {}
-            for cat in IEI_CATEGORIES:
-                # Bayes: P(cat|ans) = P(ans|cat) * P(cat) / P(ans)
-                posterior[cat] = (
-                    answer_probs.get(cat, 0) * current_probs.get(cat, 0) / p_answer
-                )
-            
-            # Weight by probability of this answer
-            expected_posterior_entropy += p_answer * calculate_entropy(posterior)
+    Args:
+        prior: Current probability vector aligned to IEI_CATEGORIES
+        likelihoods: (Q, A, C) tensor of P(answer | category), zero-padded
+    
+    Returns:
+        Tuple of (P(answer), H(posterior | answer)), each of shape (Q, A)
+    """
+    # P(answer, category) and P(answer) = Σ P(answer|category) * P(category)
+    joint = likelihoods * prior
+    p_answer = joint.sum(axis=-1)
+    
+    # Bayes: P(cat|ans) = P(ans|cat) * P(cat) / P(ans); padded answers stay zero
+    posterior = joint / np.where(p_answer > 0, p_answer, 1.0)[..., np.newaxis]
+    log_posterior = np.log2(posterior, out=np.zeros_like(posterior), where=posterior > 0)
+    posterior_entropy = -(posterior * log_posterior).sum(axis=-1)
+    return p_answer, posterior_entropy
+
+def calculate_information_gain_batch(
+    prior: np.ndarray,
+    likelihoods: np.ndarray,
+    prior_entropy: Optional[float] = None
+) -> np.ndarray:
+    """
+    Calculate expected information gain for a stack of questions at once
+    
+    Posteriors, answer marginals and posterior entropies are computed for
+    every (question, answer) pair in a few array reductions instead of
+    nested Python loops.
     
-    return current_entropy - expected_posterior_entropy
+    Args:
+        prior: Current probability vector aligned to IEI_CATEGORIES
+        likelihoods: (Q, A, C) tensor of P(answer | category), zero-padded
+        prior_entropy: H(prior) if the caller already has it
+    
+    Returns:
+        (Q,) array of information gain in bits (0.0 for questions without tables)
+    """
+    if prior_entropy is None:
+        prior_entropy = calculate_entropy(prior)
+    p_answer, posterior_entropy = answer_posterior_entropies(prior, likelihoods)
+    
+    # Weight each posterior entropy by the probability of its answer
+    expected_posterior_entropy = (p_answer * posterior_entropy).sum(axis=-1)
+    has_table = p_answer.sum(axis=-1) > 0
+    return np.where(has_table, prior_entropy - expected_posterior_entropy, 0.0)
+
+def calculate_worst_case_information_gain_batch(
+    prior: np.ndarray,
+    likelihoods: np.ndarray,
+    prior_entropy: Optional[float] = None
+) -> np.ndarray:
+    """
+    Information gain guaranteed by the least informative answer
+    
+    IG_robust(Q) = H(current) - max_answer H(posterior | answer)
+    
+    Robust to imbalanced answer distributions: a question only scores well
+    if every plausible answer narrows the differential.
+    
+    Args:
+        prior: Current probability vector aligned to IEI_CATEGORIES
+        likelihoods: (Q, A, C) tensor of P(answer | category), zero-padded
+        prior_entropy: H(prior) if the caller already has it
+    
+    Returns:
+        (Q,) array of worst-case information gain in bits
+    """
+    if prior_entropy is None:
+        prior_entropy = calculate_entropy(prior)
+    p_answer, posterior_entropy = answer_posterior_entropies(prior, likelihoods)
+    
+    # Only answers that can actually occur count towards the worst case
+    worst_posterior_entropy = np.where(p_answer > 0, posterior_entropy, 0.0).max(axis=-1)
+    has_table = p_answer.sum(axis=-1) > 0
+    return np.where(has_table, prior_entropy - worst_posterior_entropy, 0.0)
+
+# Question-scoring strategies accepted by select_next_question
+SELECTION_STRATEGIES = ('expected', 'robust')
 
 # ============================================================================
 # PATTERN MATCHING
@@ -1810,32 +2402,37 @@ def check_pathognomonic_patterns(
     """
     for pattern in patterns:
         match = True
-        for trigger in pattern.triggers:
-            # Parse trigger format: "Q23:Yes" or "Q7:Yes"
-            parts = trigger.split(':')
-            if len(parts) != 2:
-                continue
-            
-            q_id, expected_answer = parts
-            
-            # Handle compound triggers like "Ataxia+Telangiectasia"
-            if '+' in expected_answer:
-                # For Q23, we need BOTH ataxia and telangiectasia
-                # This requires special answer format handling
-                actual = answers.get(q_id, '')
-                if expected_answer not in actual and actual != "Yes":
-                    match = False
-                    break
-            else:
-                if answers.get(q_id) != expected_answer:
-                    match = False
-                    break
+        # Triggers are parsed once at construction ("Q23:Yes" -> ("Q23", "Yes"))
+        for q_id, expected_answer in pattern.parsed_triggers:
+            if not trigger_satisfied(expected_answer, answers.get(q_id)):
+                match = False
+                break
         
         if match:
             return (pattern, pattern.probability)
     
     return None
 
+def match_pathognomonic_mask(
+    answered_mask: int,
+    patterns: List[PathognomicPattern] = PATHOGNOMONIC_PATTERNS
+) -> Optional[Tuple[PathognomicPattern, float]]:
+    """
+    Bitmask equivalent of check_pathognomonic_patterns
+    
+    Args:
+        answered_mask: OR of answer_trigger_bits for every answer given so far
+        patterns: Patterns with trigger_mask precomputed from TRIGGER_BITS
+    
+    Returns:
+        Tuple of (matched_pattern, confidence) or None
+    """
+    for pattern in patterns:
+        if answered_mask & pattern.trigger_mask == pattern.trigger_mask:
+            return (pattern, pattern.probability)
+    
+    return None
+
 # ============================================================================
 # BAYESIAN UPDATE ENGINE
 # ============================================================================
@@ -1863,40 +2460,166 @@ def update_probabilities_bayesian(
     Returns:
         Updated probability distribution
     """
-    if question_id not in conditional_probs:
-        return current_probs
+    if conditional_probs is CONDITIONAL_PROBABILITIES:
+        likelihood = get_likelihood(question_id, answer)
+        if likelihood is None:
+            return current_probs
+    else:
+        if question_id not in conditional_probs:
+            return current_probs
+        
+        if answer not in conditional_probs[question_id]:
+            return current_probs
+        
+        answer_probs = conditional_probs[question_id][answer]
+        likelihood = np.array([answer_probs.get(cat, 0) for cat in IEI_CATEGORIES])
     
-    if answer not in conditional_probs[question_id]:
+    updated = update_probability_vector(probabilities_to_array(current_probs), likelihood)
+    if updated is None:
         return current_probs
     
-    answer_probs = conditional_probs[question_id][answer]
+    return dict(zip(IEI_CATEGORIES, updated.tolist()))
+
+def update_probability_vector(
+    prior: np.ndarray,
+    likelihood: np.ndarray,
+    floor: float = 0.005
+) -> Optional[np.ndarray]:
+    """
+    Bayesian update of a probability vector aligned to IEI_CATEGORIES
+    
+    Args:
+        prior: Current probability vector
+        likelihood: P(answer | category) for the given answer
+        floor: Minimum posterior kept for every category before re-normalizing
+    
+    Returns:
+        Updated probability vector, or None if the answer has zero probability
+    """
+    if posterior_update is not None:
+        updated, possible = posterior_update(prior, likelihood, floor)
+        return updated if possible else None
     
     # Calculate P(answer) = Σ P(answer|category) * P(category)
-    p_answer = sum(
-        answer_probs.get(cat, 0) * current_probs.get(cat, 0)
-        for cat in IEI_CATEGORIES
-    )
+    # (one output buffer, updated in place below)
+    updated = np.multiply(likelihood, prior, dtype=np.float64)
+    p_answer = updated.sum()
     
     if p_answer == 0:
-        return current_probs
+        return None
     
-    # Calculate posterior for each category
-    updated = {}
-    for cat in IEI_CATEGORIES:
-        # Bayes' theorem
-        posterior = (
-            answer_probs.get(cat, 0) * current_probs.get(cat, 0) / p_answer
-        )
-        # Apply floor: minimum 0.5% to keep all categories alive
-        updated[cat] = max(posterior, 0.005)
+    # Bayes' theorem, then floor to keep all categories alive
+    updated /= p_answer
+    np.maximum(updated, floor, out=updated)
     
     # Re-normalize to ensure sum = 1.0
-    total = sum(updated.values())
-    if total > 0:
-        updated = {cat: prob / total for cat, prob in updated.items()}
-    
+    updated /= updated.sum()
     return updated
 
+def logsumexp(log_values: np.ndarray) -> float:
+    """Numerically stable log(Σ exp(x))"""
+    peak = log_values.max()
+    if not np.isfinite(peak):
+        return float(peak)
+    return float(peak + np.log(np.exp(log_values - peak).sum()))
+
+def update_log_probability_vector(
+    log_prior: np.ndarray,
+    likelihood: np.ndarray,
+    floor: float = 0.005
+) -> Optional[np.ndarray]:
+    """
+    Bayesian update carried out in log space
+    
+    log P(category | answer) = log P(answer | category) + log P(category) - log P(answer)
+    
+    Same result as update_probability_vector, but the posterior is kept as
+    normalized log-probabilities so long sessions never underflow.
+    
+    Args:
+        log_prior: Current log-probability vector
+        likelihood: P(answer | category) for the given answer
+        floor: Minimum posterior kept for every category before re-normalizing
+    
+    Returns:
+        Updated log-probability vector, or None if the answer has zero probability
+    """
+    with np.errstate(divide='ignore'):
+        log_likelihood = np.log(likelihood)
+    return update_log_posterior(log_prior, log_likelihood, floor)
+
+def update_log_posterior(
+    log_prior: np.ndarray,
+    log_likelihood: np.ndarray,
+    floor: float = 0.005
+) -> Optional[np.ndarray]:
+    """
+    update_log_probability_vector for a precomputed log-likelihood row
+    
+    Args:
+        log_prior: Current log-probability vector
+        log_likelihood: log P(answer | category), e.g. a LOG_LIKELIHOOD_TENSOR row
+        floor: Minimum posterior kept for every category before re-normalizing
+    
+    Returns:
+        Updated log-probability vector, or None if the answer has zero probability
+    """
+    if log_posterior_update is not None:
+        log_posterior, possible = log_posterior_update(log_prior, log_likelihood, np.log(floor))
+        return log_posterior if possible else None
+    
+    log_posterior = np.add(log_prior, log_likelihood, dtype=np.float64)
+    
+    # log P(answer) = log Σ P(answer|category) * P(category)
+    log_p_answer = logsumexp(log_posterior)
+    if log_p_answer == -np.inf:
+        return None
+    
+    # Bayes' theorem, then floor to keep all categories alive (in place)
+    log_posterior -= log_p_answer
+    np.maximum(log_posterior, np.log(floor), out=log_posterior)
+    
+    # Re-normalize to ensure sum = 1.0
+    log_posterior -= logsumexp(log_posterior)
+    return log_posterior
+
+def update_log_posterior_rows(
+    log_priors: np.ndarray,
+    log_likelihood: np.ndarray,
+    floor: float = 0.005
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    update_log_posterior for several patients who gave the same answer
+    
+    The one likelihood row is broadcast over a (n_patients, C) block, so it
+    is loaded once for the whole group.
+    
+    Args:
+        log_priors: (n_patients, C) log-probability rows
+        log_likelihood: log P(answer | category) for the shared answer
+        floor: Minimum posterior kept for every category before re-normalizing
+    
+    Returns:
+        (updated rows, (n_patients,) bool mask of rows the answer was possible
+        for); impossible rows are returned unchanged
+    """
+    log_joint = log_priors + log_likelihood
+    peak = log_joint.max(axis=1, keepdims=True)
+    possible = np.isfinite(peak[:, 0])
+    peak = np.where(possible[:, None], peak, 0.0)
+    
+    # Impossible rows have log P(answer) = -inf and turn into NaN (-inf - -inf)
+    # below; they are replaced by their prior on return
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # log P(answer) per patient
+        log_p_answer = peak + np.log(np.exp(log_joint - peak).sum(axis=1, keepdims=True))
+        
+        # Bayes' theorem, floor, then re-normalize each row
+        log_posterior = np.maximum(log_joint - log_p_answer, np.log(floor))
+        peak = log_posterior.max(axis=1, keepdims=True)
+        log_posterior -= peak + np.log(np.exp(log_posterior - peak).sum(axis=1, keepdims=True))
+    return np.where(possible[:, None], log_posterior, log_priors), possible
+
 # ============================================================================
 # WEIGHTED QUESTION SELECTION
 # ============================================================================
@@ -1905,8 +2628,10 @@ def select_next_question(
     current_probs: Dict[str, float],
     available_questions: List[str],
     questions_dict: Dict[str, Question],
-    conditional_probs: Dict[str, Dict[str, Dict[str, float]]]
-) -> str:
+    conditional_probs: Dict[str, Dict[str, Dict[str, float]]],
+    strategy: str = 'expected',
+    current_entropy: Optional[float] = None
+) -> Optional[str]:
     """
     Select next question using weighted information gain
     
@@ -1919,43 +2644,82 @@ def select_next_question(
         available_questions: List of question IDs not yet asked
         questions_dict: Question definitions
         conditional_probs: Conditional probability tables
+        strategy: 'expected' (average over answers) or 'robust'
+            (least informative answer) information gain
+        current_entropy: Entropy of current_probs, if already computed this turn
     
     Returns:
-        Question ID with highest weighted information gain
+        Question ID with highest weighted information gain, or None if no
+        available question is in questions_dict
+    
+    Raises:
+        ValueError: Unknown strategy
     """
     # Find leading categories (top 3 by probability)
     sorted_cats = sorted(current_probs.items(), key=lambda x: x[1], reverse=True)
     leading_categories = {cat for cat, _ in sorted_cats[:3]}
     
-    best_question = None
-    best_weighted_ig = -1.0
-    
-    for q_id in available_questions:
-        if q_id not in questions_dict:
-            continue
-        
-        question = questions_dict[q_id]
-        
-        # Calculate base information gain
-        base_ig = calculate_information_gain(current_probs, q_id, conditional_probs)
-        
-        # Calculate relevance weight
-        # Questions that discriminate well among leading categories get bonus
-        relevance_weight = calculate_relevance_weight(
-            q_id, leading_categories, conditional_probs
-        )
-        
-        # Apply nodal weight if applicable
-        nodal_weight = question.nodal_weight if question.is_nodal else 1.0
-        
-        # Combined weighted information gain
-        weighted_ig = base_ig * relevance_weight * nodal_weight
-        
-        if weighted_ig > best_weighted_ig:
-            best_weighted_ig = weighted_ig
-            best_question = q_id
-    
-    return best_question
+    candidates = [q_id for q_id in available_questions if q_id in questions_dict]
+    if not candidates:
+        return None
+    
+    if strategy not in SELECTION_STRATEGIES:
+        raise ValueError(f"Unknown selection strategy: {strategy!r}")
+    prior = probabilities_to_array(current_probs)
+    # The module tables are indexed by QUESTION_IDS; a custom questions_dict
+    # may add questions they have no rows for, which score as having no table
+    module_tables = conditional_probs is CONDITIONAL_PROBABILITIES and all(
+        q_id in QUESTION_INDEX for q_id in candidates
+    )
+    if module_tables or questions_dict is QUESTIONS:
+        candidate_idx = question_indices(candidates)
+    
+    # Calculate relevance weight
+    # Questions that discriminate well among leading categories get bonus
+    if module_tables and is_leading_set(leading_categories):
+        relevance_weight = RELEVANCE_WEIGHTS[leading_set_row(leading_categories), candidate_idx]
+    else:
+        relevance_weight = np.array([
+            calculate_relevance_weight(q_id, leading_categories, conditional_probs)
+            for q_id in candidates
+        ])
+    
+    # Apply nodal weight if applicable
+    if questions_dict is QUESTIONS:
+        nodal_weight = QUESTION_NODAL_MULTIPLIER[candidate_idx]
+    else:
+        nodal_weight = np.array([
+            questions_dict[q_id].nodal_weight if questions_dict[q_id].is_nodal else 1.0
+            for q_id in candidates
+        ])
+    
+    # Compiled branch-and-bound scan over the module tables
+    if (
+        strategy == 'expected'
+        and best_weighted_question is not None
+        and module_tables
+    ):
+        return candidates[best_weighted_question(
+            LIKELIHOOD_TENSOR, LOG2_LIKELIHOOD_TENSOR, prior,
+            candidate_idx, relevance_weight, nodal_weight
+        )]
+    
+    # Base information gain for every candidate in one vectorized pass
+    if module_tables:
+        likelihoods = LIKELIHOOD_TENSOR[candidate_idx]
+    else:
+        likelihoods = build_likelihood_tensor(candidates, conditional_probs)
+    
+    if strategy == 'robust':
+        base_ig = calculate_worst_case_information_gain_batch(prior, likelihoods, current_entropy)
+    else:
+        base_ig = calculate_information_gain_batch(prior, likelihoods, current_entropy)
+    
+    # Combined weighted information gain
+    weighted_ig = base_ig * relevance_weight * nodal_weight
+    
+    # argmax keeps the first of equally-weighted questions
+    return candidates[int(np.argmax(weighted_ig))]
 
 def calculate_relevance_weight(
     question_id: str,
@@ -1979,17 +2743,32 @@ def calculate_relevance_weight(
     if question_id not in conditional_probs:
         return 1.0
     
+    # The module tables are fixed, and there are only C(8, 3) leading sets
+    if conditional_probs is CONDITIONAL_PROBABILITIES and is_leading_set(leading_categories):
+        return float(RELEVANCE_WEIGHTS[
+            leading_set_row(leading_categories), QUESTION_INDEX[question_id]
+        ])
+    
+    return _relevance_weight(conditional_probs[question_id], leading_categories)
+
+def _relevance_weight(
+    question_table: Dict[str, Dict[str, float]],
+    leading_categories: set
+) -> float:
+    """Relevance weight from one question's conditional probability table"""
     # Calculate variance in probabilities across leading categories
     # for each possible answer
     max_variance = 0.0
     
-    for answer, answer_probs in conditional_probs[question_id].items():
+    for answer, answer_probs in question_table.items():
         leading_probs = [
             answer_probs.get(cat, 0) for cat in leading_categories
         ]
         
         if leading_probs:
-            variance = np.var(leading_probs)
+            # Population variance inline; np.var call overhead dwarfs 3 values
+            mean = sum(leading_probs) / len(leading_probs)
+            variance = sum((p - mean) ** 2 for p in leading_probs) / len(leading_probs)
             max_variance = max(max_variance, variance)
     
     # Convert variance to weight (1.0 to 2.0 range)
@@ -1998,6 +2777,132 @@ def calculate_relevance_weight(
     
     return relevance_weight
 
+# Relevance weight of every question for every possible top-3 leading set over
+# the module tables: RELEVANCE_WEIGHTS[LEADING_SET_ROW[mask], q], where mask has
+# one bit per IEI_CATEGORIES position. Built from LIKELIHOOD_TENSOR_F64 so the
+# values match _relevance_weight.
+LEADING_SETS = np.array(list(combinations(range(len(IEI_CATEGORIES)), 3)), dtype=np.intp)
+LEADING_SET_ROW = np.full(1 << len(IEI_CATEGORIES), -1, dtype=np.int8)
+LEADING_SET_ROW[(1 << LEADING_SETS).sum(axis=1)] = np.arange(len(LEADING_SETS))
+
+def _build_relevance_weights() -> np.ndarray:
+    # (Q, A, n_sets): variance across each leading set, per answer; padding
+    # rows have zero variance and never raise the maximum
+    variance = LIKELIHOOD_TENSOR_F64[:, :, LEADING_SETS].var(axis=-1)
+    max_variance = variance.max(axis=1).T
+    return 1.0 + np.minimum(max_variance * 10, 1.0)
+
+RELEVANCE_WEIGHTS = _build_relevance_weights()
+RELEVANCE_WEIGHTS.setflags(write=False)
+LEADING_SET_ROW.setflags(write=False)
+
+def is_leading_set(leading_categories: set) -> bool:
+    """Whether a set of category names has a RELEVANCE_WEIGHTS row"""
+    return len(leading_categories) == 3 and all(
+        cat in CATEGORY_INDEX for cat in leading_categories
+    )
+
+def leading_set_row(leading_categories: set) -> int:
+    """RELEVANCE_WEIGHTS row of a set of three leading category names"""
+    mask = 0
+    for cat in leading_categories:
+        mask |= 1 << CATEGORY_INDEX[cat]
+    return int(LEADING_SET_ROW[mask])
+
+# Shared by every session in the process: interviews that reach the same
+# posterior with the same questions asked (common opening answers, replays)
+# reuse one scan. ~8k entries of a few hundred bytes each.
+@lru_cache(maxsize=8192)
+def select_next_question_cached(
+    log_probs_key: bytes,
+    asked_mask: int,
+    strategy: str = 'expected',
+    current_entropy: Optional[float] = None
+) -> Optional[str]:
+    """
+    Memoized select_next_question over the module tables
+    
+    Keyed on the exact posterior (raw bytes of the log-probability vector) and
+    the bitmask of asked questions over QUESTION_IDS, so replaying a session
+    (e.g. after Reset) skips the information-gain scan. Bounded to cap memory.
+    
+    The posterior rather than the set of answers is the key: the per-answer
+    floor makes the posterior depend on answer order, so the same answers in
+    a different order are a different state.
+    """
+    probs = np.exp(np.frombuffer(log_probs_key, dtype=np.float64))
+    available = [QUESTION_IDS[i] for i in np.flatnonzero(~asked_array(asked_mask))]
+    return select_next_question(
+        dict(zip(IEI_CATEGORIES, probs.tolist())),
+        available,
+        QUESTIONS,
+        CONDITIONAL_PROBABILITIES,
+        strategy,
+        current_entropy
+    )
+
+def select_next_question_from_tables(
+    probs: np.ndarray,
+    available_questions: List[str],
+    likelihoods: np.ndarray,
+    question_index: Dict[str, int],
+    strategy: str = 'expected',
+    current_entropy: Optional[float] = None
+) -> Optional[str]:
+    """
+    select_next_question over a likelihood tensor instead of table dicts
+    
+    Used by engines built with custom or loaded tables (see
+    load_likelihood_tables), so questions are chosen from the same tables the
+    posterior is updated with. Same weighting and tie-breaking as
+    select_next_question; questions without a row in question_index score as
+    questions without a table (IG 0, relevance 1.0).
+    
+    Args:
+        probs: Current probability vector aligned to IEI_CATEGORIES
+        available_questions: Question IDs not yet asked
+        likelihoods: (Q, A, C) tensor of P(answer | category), zero-padded
+        question_index: Question ID -> position on the first axis of likelihoods
+        strategy: 'expected' or 'robust' information gain
+        current_entropy: Entropy of probs, if already computed this turn
+    
+    Returns:
+        Question ID with highest weighted information gain, or None if no
+        available question is in QUESTIONS
+    """
+    candidates = [q_id for q_id in available_questions if q_id in QUESTIONS]
+    if not candidates:
+        return None
+    if strategy not in SELECTION_STRATEGIES:
+        raise ValueError(f"Unknown selection strategy: {strategy!r}")
+    
+    # Leading categories: stable top 3, ties in IEI_CATEGORIES order as with sorted()
+    leading_idx = np.argsort(-probs, kind='stable')[:3]
+    
+    rows = np.array([question_index.get(q_id, -1) for q_id in candidates])
+    has_table = rows >= 0
+    tables = np.zeros((len(candidates),) + likelihoods.shape[1:], dtype=likelihoods.dtype)
+    tables[has_table] = likelihoods[rows[has_table]]
+    
+    if strategy == 'robust':
+        base_ig = calculate_worst_case_information_gain_batch(probs, tables, current_entropy)
+    else:
+        base_ig = calculate_information_gain_batch(probs, tables, current_entropy)
+    
+    # Relevance: largest variance across the leading categories over answers;
+    # padding rows and missing tables have zero variance
+    max_variance = tables[:, :, leading_idx].astype(np.float64).var(axis=-1).max(axis=-1)
+    relevance_weight = 1.0 + np.minimum(max_variance * 10, 1.0)
+    
+    nodal_weight = QUESTION_NODAL_MULTIPLIER[question_indices(candidates)]
+    weighted_ig = base_ig * relevance_weight * nodal_weight
+    
+    # argmax keeps the first of equally-weighted questions
+    return candidates[int(np.argmax(weighted_ig))]
+
+# Interviews open with the highest nodal-weighted IG question (Q15, see app.py)
+FIRST_QUESTION = select_static_question(0)
+
 # ============================================================================
 # MAIN DIAGNOSTIC ENGINE
 # ============================================================================
@@ -2010,16 +2915,87 @@ class IEIDiagnosticEngine:
     3. Pattern recognition (pathognomonic findings)
     """
     
-    def __init__(self):
-        self.current_probs = initialize_prior_probabilities()
+    def __init__(
+        self,
+        likelihoods: np.ndarray = LIKELIHOOD_TENSOR,
+        log_likelihoods: Optional[np.ndarray] = None,
+        question_index: Dict[str, int] = QUESTION_INDEX,
+        answer_index: Dict[str, Dict[str, int]] = ANSWER_INDEX,
+        strategy: str = 'expected'
+    ):
+        if strategy not in SELECTION_STRATEGIES:
+            raise ValueError(f"Unknown selection strategy: {strategy!r}")
+        self.strategy = strategy
+        
+        # Static tables (see get_static_tables) are shared, not copied
+        self.likelihoods = likelihoods
+        if log_likelihoods is None:
+            if likelihoods is LIKELIHOOD_TENSOR:
+                log_likelihoods = LOG_LIKELIHOOD_TENSOR
+            else:
+                with np.errstate(divide='ignore'):
+                    log_likelihoods = np.log(likelihoods)
+        self.log_likelihoods = log_likelihoods
+        self.question_index = question_index
+        self.answer_index = answer_index
+        # Question selection uses the memoized scan over the module tables only
+        # when the engine updates with them too; otherwise it scores questions
+        # against the engine's own tables
+        self.uses_module_tables = (
+            likelihoods is LIKELIHOOD_TENSOR and question_index is QUESTION_INDEX
+        )
+        
+        # Log-posterior over IEI_CATEGORIES; probability and dict views are derived
+        self.log_probs = LOG_PRIOR.copy()
+        self._entropy = (None, 0.0)  # (log_probs it was computed for, entropy)
         self.answers = {}
         self.asked_questions = []
         self.pathognomonic_match = None
+        self.answered_mask = 0  # Satisfied pathognomonic trigger bits
+        self.asked_mask = 0     # Asked questions, one bit per QUESTION_IDS position
         
         # NEW: Evidence accumulator for specific syndromes
         # Scores persist across questions (gestalt memory)
         self.evidence_scores = {syndrome: 0 for syndrome in SPECIFIC_SYNDROMES.keys()}
         
+    @property
+    def nodal_questions_asked(self) -> int:
+        """Number of nodal (category-routing) questions asked so far"""
+        return (self.asked_mask & NODAL_QUESTION_MASK).bit_count()
+    
+    @property
+    def asked_effective_ig(self) -> float:
+        """Static nodal-weighted IG covered by the questions asked so far"""
+        return total_effective_ig(self.asked_mask)
+    
+    @property
+    def probs(self) -> np.ndarray:
+        """Current posterior as a probability vector aligned to IEI_CATEGORIES"""
+        return np.exp(self.log_probs)
+    
+    @probs.setter
+    def probs(self, probabilities: np.ndarray):
+        with np.errstate(divide='ignore'):
+            self.log_probs = np.log(np.asarray(probabilities, dtype=np.float64))
+    
+    @property
+    def entropy(self) -> float:
+        """Entropy of the current posterior in bits, computed once per update"""
+        source, value = self._entropy
+        if source is not self.log_probs:
+            value = calculate_entropy(self.probs)
+            self._entropy = (self.log_probs, value)
+        return value
+    
+    @property
+    def current_probs(self) -> Dict[str, float]:
+        """Current posterior as a {category: probability} dict"""
+        return dict(zip(IEI_CATEGORIES, self.probs.tolist()))
+    
+    @current_probs.setter
+    def current_probs(self, probabilities: Dict[str, float]):
+        self.probs = probabilities_to_array(probabilities)
+    
     def update_evidence_scores(self, question_id: str, answer: str):
         """
         Update evidence scores for specific syndromes based on answer
@@ -2045,15 +3021,37 @@ class IEIDiagnosticEngine:
         ]
         return sorted(candidates, key=lambda x: x[1], reverse=True)[:n]
         
+    def _with_turn_summary(self, result: Dict) -> Dict:
+        """
+        Attach the per-turn summary outputs to a result
+        
+        Entropy, the top-3 categories and a snapshot of the probability
+        vector are computed once here so the UI can render them on the
+        following rerun without recomputing.
+        """
+        probs = self.probs
+        result.setdefault('entropy', self.entropy)
+        result['top3'] = self.get_top_diagnoses(n=3)
+        result['probs_vec'] = probs.copy()
+        return result
+    
     def process_answer(self, question_id: str, answer: str) -> Dict:
         """
         Process an answer and update probabilities
         
         Returns diagnostic state and next question
         """
+        # Interned inputs match the interned table keys by identity
+        question_id = sys.intern(question_id)
+        answer = sys.intern(answer)
+        
         # Store answer
         self.answers[question_id] = answer
         self.asked_questions.append(question_id)
+        self.answered_mask &= ~question_trigger_bits(question_id)
+        self.answered_mask |= answer_trigger_bits(question_id, answer)
+        if question_id in QUESTION_INDEX:
+            self.asked_mask |= 1 << QUESTION_INDEX[question_id]
         
         # UPDATE EVIDENCE SCORES (gestalt accumulation)
         self.update_evidence_scores(question_id, answer)
@@ -2064,10 +3062,7 @@ class IEIDiagnosticEngine:
         
         # Check for pathognomonic patterns ONLY if minimum questions met
         if min_questions_met:
-            pattern_match = check_pathognomonic_patterns(
-                self.answers, 
-                PATHOGNOMONIC_PATTERNS
-            )
+            pattern_match = match_pathognomonic_mask(self.answered_mask)
             
             if pattern_match:
                 pattern, confidence = pattern_match
@@ -2075,33 +3070,34 @@ class IEIDiagnosticEngine:
                 
                 # If very high confidence, suggest confirmation questions
                 if confidence >= 0.90:
-                    return {
+                    return self._with_turn_summary({
                         'status': 'pattern_detected',
                         'suspected_diagnosis': pattern.name,
                         'confidence': confidence,
                         'category': pattern.category,
                         'confirm_with': pattern.confirm_with,
                         'current_probabilities': self.current_probs
-                    }
+                    })
         
         # Update probabilities using Bayes' theorem
-        self.current_probs = update_probabilities_bayesian(
-            self.current_probs,
-            question_id,
-            answer,
-            CONDITIONAL_PROBABILITIES
-        )
+        answer_idx = self.answer_index.get(question_id, {}).get(answer)
+        if answer_idx is not None:
+            log_likelihood = self.log_likelihoods[self.question_index[question_id], answer_idx]
+            updated = update_log_posterior(self.log_probs, log_likelihood)
+            if updated is not None:
+                self.log_probs = updated
         
         # Check stopping criteria
-        max_prob = max(self.current_probs.values())
-        current_entropy = calculate_entropy(self.current_probs)
+        probs = self.probs
+        max_prob = float(probs.max())
+        current_entropy = self.entropy
         
         # Stop if VERY high confidence OR very low entropy
         # BUT only after asking minimum questions
         # Raised threshold to 99.5% to prevent overconfidence
         if min_questions_met and (max_prob >= 0.995 or current_entropy < 0.15):
             syndrome_candidates = self.get_top_syndrome_candidates(n=5)
-            return {
+            return self._with_turn_summary({
                 'status': 'diagnosis_reached',
                 'top_diagnosis': self.get_top_diagnoses(n=1)[0],
                 'differential': self.get_top_diagnoses(n=8),  # Show all 8 categories
@@ -2109,34 +3105,33 @@ class IEIDiagnosticEngine:
                 'confidence': max_prob,
                 'entropy': current_entropy,
                 'current_probabilities': self.current_probs
-            }
-        
-        # Select next question
-        available = [
-            q_id for q_id in QUESTIONS.keys() 
-            if q_id not in self.asked_questions
-        ]
+            })
         
-        if not available:
+        # Select next question (unasked questions are the clear bits of asked_mask)
+        if self.asked_mask == ALL_QUESTIONS_MASK:
             # No more questions, return top differential
             syndrome_candidates = self.get_top_syndrome_candidates(n=5)
-            return {
+            return self._with_turn_summary({
                 'status': 'questions_exhausted',
                 'differential': self.get_top_diagnoses(n=8),  # Show all 8 categories
                 'syndrome_candidates': syndrome_candidates,  # NEW: Specific syndromes
                 'entropy': current_entropy,
                 'current_probabilities': self.current_probs
-            }
+            })
         
-        next_q = select_next_question(
-            self.current_probs,
-            available,
-            QUESTIONS,
-            CONDITIONAL_PROBABILITIES
-        )
+        if self.uses_module_tables:
+            next_q = select_next_question_cached(
+                self.log_probs.tobytes(), self.asked_mask, self.strategy, current_entropy
+            )
+        else:
+            available = [QUESTION_IDS[i] for i in np.flatnonzero(~asked_array(self.asked_mask))]
+            next_q = select_next_question_from_tables(
+                probs, available, self.likelihoods, self.question_index,
+                self.strategy, current_entropy
+            )
         
         syndrome_candidates = self.get_top_syndrome_candidates(n=3)
-        return {
+        return self._with_turn_summary({
             'status': 'continue',
             'next_question': next_q,
             'question_text': QUESTIONS[next_q].text,
@@ -2145,23 +3140,138 @@ class IEIDiagnosticEngine:
             'top_categories': self.get_top_diagnoses(n=3),
             'syndrome_candidates': syndrome_candidates,  # NEW: Current leading syndromes
             'current_probabilities': self.current_probs
-        }
+        })
     
     def get_top_diagnoses(self, n: int = 5) -> List[Tuple[str, float]]:
         """Get top N diagnoses by probability"""
-        sorted_probs = sorted(
-            self.current_probs.items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )
-        return sorted_probs[:n]
+        # Stable sort keeps tied categories in IEI_CATEGORIES order
+        probs = self.probs
+        order = np.argsort(-probs, kind='stable')[:n]
+        return [(IEI_CATEGORIES[i], float(probs[i])) for i in order]
     
     def reset(self):
         """Reset the engine for a new patient"""
-        self.current_probs = initialize_prior_probabilities()
+        self.log_probs = LOG_PRIOR.copy()
         self.answers = {}
         self.asked_questions = []
         self.pathognomonic_match = None
+        self.answered_mask = 0
+        self.asked_mask = 0
+
+class PosteriorBatch:
+    """
+    Category posteriors for many concurrent patients in one (K, C) array
+    
+    Only the Bayesian part of IEIDiagnosticEngine is batched: each row
+    follows the same floored log-space update as update_log_posterior, with
+    no pattern detection, stopping rules or question selection. Pending
+    answers are grouped by QA_ROW so each likelihood row is applied once per
+    group, including identical rows shared by different questions.
+    """
+    
+    def __init__(
+        self,
+        log_likelihood_rows: np.ndarray = LOG_LIKELIHOOD_ROWS,
+        qa_row: Dict[Tuple[str, str], int] = QA_ROW
+    ):
+        self.log_likelihood_rows = log_likelihood_rows
+        self.qa_row = qa_row
+        # Rows live in a preallocated buffer that doubles when full, so adding
+        # K sessions copies O(K) rows in total; log_probs views the live rows
+        self._buffer = np.empty((16, len(IEI_CATEGORIES)))
+        self.row_of = {}  # session_id -> row index
+        self.session_at = []  # row index -> session_id
+    
+    def __len__(self) -> int:
+        return len(self.session_at)
+    
+    @property
+    def log_probs(self) -> np.ndarray:
+        """(K, C) log-posteriors, one row per session (a view, valid until the next add)"""
+        return self._buffer[:len(self.session_at)]
+    
+    def add_session(self, session_id) -> int:
+        """Start a patient at the prior and return its row index"""
+        if session_id in self.row_of:
+            raise ValueError(f"Session already registered: {session_id!r}")
+        row_idx = len(self.session_at)
+        if row_idx == len(self._buffer):
+            grown = np.empty((2 * len(self._buffer), self._buffer.shape[1]))
+            grown[:row_idx] = self._buffer
+            self._buffer = grown
+        self._buffer[row_idx] = LOG_PRIOR
+        self.row_of[session_id] = row_idx
+        self.session_at.append(session_id)
+        return row_idx
+    
+    def remove_session(self, session_id):
+        """
+        Drop a patient's row
+        
+        The last row is moved into the freed slot, so the session that owned
+        it changes row index.
+        
+        Returns:
+            The session_id whose row moved, or None if the removed row was last
+        """
+        row_idx = self.row_of.pop(session_id)
+        last = self.session_at.pop()
+        if row_idx == len(self.session_at):
+            return None
+        self._buffer[row_idx] = self._buffer[len(self.session_at)]
+        self.session_at[row_idx] = last
+        self.row_of[last] = row_idx
+        return last
+    
+    def reset_session(self, session_id):
+        """Return a patient's row to the prior"""
+        self._buffer[self.row_of[session_id]] = LOG_PRIOR
+    
+    def apply_answer(self, row_idx: int, question_id: str, answer: str) -> bool:
+        """
+        Update one patient's row
+        
+        Returns:
+            False if the answer has no table or zero probability (row unchanged)
+        """
+        return bool(self.apply_answers([(row_idx, question_id, answer)])[0])
+    
+    def apply_answers(self, pending: List[Tuple[int, str, str]]) -> np.ndarray:
+        """
+        Apply a tick of (row_idx, question_id, answer) updates
+        
+        A row may appear at most once per tick, since grouping reorders updates.
+        
+        Returns:
+            (len(pending),) bool array, True where the row was updated
+        """
+        rows = [row_idx for row_idx, _, _ in pending]
+        if len(set(rows)) != len(rows):
+            raise ValueError("A session can only answer once per batch")
+        
+        groups = defaultdict(list)
+        for i, (_, q_id, answer) in enumerate(pending):
+            table_row = self.qa_row.get((q_id, answer))
+            if table_row is not None:
+                groups[table_row].append(i)
+        
+        applied = np.zeros(len(pending), dtype=bool)
+        for table_row, members in groups.items():
+            row_idx = np.array([rows[i] for i in members])
+            self.log_probs[row_idx], possible = update_log_posterior_rows(
+                self.log_probs[row_idx], self.log_likelihood_rows[table_row]
+            )
+            applied[members] = possible
+        return applied
+    
+    def probs(self, session_id) -> np.ndarray:
+        """Posterior probability vector for one patient, aligned to IEI_CATEGORIES"""
+        return np.exp(self.log_probs[self.row_of[session_id]])
+    
+    @property
+    def prob_matrix(self) -> np.ndarray:
+        """(K, C) posterior probabilities, one row per session"""
+        return np.exp(self.log_probs)
 
 # ============================================================================
 # TESTING AND VALIDATION
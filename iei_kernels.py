@@ -0,0 +1,246 @@
+"""
+IEI Diagnostic Engine - Compiled Numeric Kernels
+Numba-jitted inner loops for the per-turn question scan
+"""
+
+import numpy as np
+from numba import njit
+
+# ============================================================================
+# EXPECTED INFORMATION GAIN
+# ============================================================================
+
+@njit(cache=True)
+def _question_information_gain(
+    likelihoods: np.ndarray,
+    log2_likelihoods: np.ndarray,
+    prior: np.ndarray,
+    log2_prior: np.ndarray,
+    prior_entropy: float,
+    q: int
+) -> float:
+    """
+    Information gain of question q in bits (0.0 without a table)
+    
+    IG(Q) = H(prior) - Σ P(answer) * H(posterior | answer)
+    
+    With joint_c = P(answer|c) * P(c), the posterior entropy is expanded as
+    
+    H(posterior | answer) = log2 P(answer) - Σ joint_c * (log2 P(answer|c) + log2 P(c)) / P(answer)
+    
+    so the only per-answer log is log2 P(answer): log2 P(answer|c) comes from
+    the precomputed table and log2 P(c) is taken once per scan.
+    """
+    n_answers, n_categories = likelihoods.shape[1], likelihoods.shape[2]
+    expected_posterior_entropy = 0.0
+    total_answer_prob = 0.0
+    for a in range(n_answers):
+        # P(answer) = Σ P(answer|category) * P(category), and
+        # Σ joint * log2(joint) over the categories that can give it
+        p_answer = 0.0
+        joint_log_joint = 0.0
+        for c in range(n_categories):
+            joint = likelihoods[q, a, c] * prior[c]
+            if joint > 0:
+                p_answer += joint
+                joint_log_joint += joint * (log2_likelihoods[q, a, c] + log2_prior[c])
+        if p_answer <= 0:
+            continue
+        
+        # P(answer) * H(posterior | answer)
+        expected_posterior_entropy += p_answer * np.log2(p_answer) - joint_log_joint
+        total_answer_prob += p_answer
+    
+    if total_answer_prob > 0:
+        return prior_entropy - expected_posterior_entropy
+    return 0.0
+
+@njit(cache=True)
+def _log2_prior_and_entropy(prior: np.ndarray):
+    """log2 of the prior (0 where the prior is 0) and its entropy in bits"""
+    log2_prior = np.zeros(prior.shape[0])
+    prior_entropy = 0.0
+    for c in range(prior.shape[0]):
+        if prior[c] > 0:
+            log2_prior[c] = np.log2(prior[c])
+            prior_entropy -= prior[c] * log2_prior[c]
+    return log2_prior, prior_entropy
+
+@njit(cache=True)
+def best_weighted_question(
+    likelihoods: np.ndarray,
+    log2_likelihoods: np.ndarray,
+    prior: np.ndarray,
+    candidates: np.ndarray,
+    relevance_weight: np.ndarray,
+    nodal_weight: np.ndarray
+) -> int:
+    """
+    Position in candidates of the highest IG * relevance * nodal question
+    
+    Branch and bound: IG never exceeds H(prior), so H(prior) * relevance *
+    nodal bounds each candidate's score. Candidates are visited by descending
+    bound and the scan stops once no remaining bound can reach the best score.
+    Equal scores go to the earliest candidate, as with np.argmax.
+    
+    Args:
+        likelihoods: (Q, A, C) tensor of P(answer | category), zero-padded
+        log2_likelihoods: float64 log2 of likelihoods (values at zero
+            entries are never read)
+        prior: Current probability vector aligned to IEI_CATEGORIES
+        candidates: Question positions (first axis of likelihoods) to choose from
+        relevance_weight, nodal_weight: Weights aligned to candidates
+    
+    Returns:
+        Index into candidates
+    """
+    log2_prior, prior_entropy = _log2_prior_and_entropy(prior)
+    n_candidates = candidates.shape[0]
+    bounds = np.empty(n_candidates)
+    for i in range(n_candidates):
+        bounds[i] = prior_entropy * relevance_weight[i] * nodal_weight[i]
+    order = np.argsort(-bounds, kind='mergesort')
+    
+    best = 0
+    best_score = -np.inf
+    for i in order:
+        # Slack covers rounding that can put IG an ulp above H(prior)
+        if bounds[i] * (1.0 + 1e-9) < best_score:
+            break
+        gain = _question_information_gain(
+            likelihoods, log2_likelihoods, prior, log2_prior, prior_entropy, candidates[i]
+        )
+        score = gain * relevance_weight[i] * nodal_weight[i]
+        if score > best_score or (score == best_score and i < best):
+            best = i
+            best_score = score
+    return best
+
+# ============================================================================
+# QUESTION BITMASK REDUCTIONS
+# ============================================================================
+
+@njit(cache=True)
+def masked_sum(mask: np.uint64, values: np.ndarray) -> float:
+    """
+    Sum of values at the set bit positions of a question bitmask
+    
+    Args:
+        mask: Bitmask over QUESTION_IDS positions (e.g. the asked-question mask)
+        values: Per-question column aligned to QUESTION_IDS
+    
+    Returns:
+        Σ values[i] for every bit i set in mask
+    """
+    total = 0.0
+    i = 0
+    while mask:
+        if mask & np.uint64(1):
+            total += values[i]
+        mask >>= np.uint64(1)
+        i += 1
+    return total
+
+# ============================================================================
+# BAYESIAN UPDATE
+# ============================================================================
+
+@njit(cache=True)
+def log_posterior_update(
+    log_prior: np.ndarray,
+    log_likelihood: np.ndarray,
+    log_floor: float
+):
+    """
+    Floored log-space Bayesian update in one pass
+    
+    Same steps as update_log_posterior: add the log-likelihood, normalize by
+    log P(answer), floor every category at log_floor, then re-normalize.
+    
+    Args:
+        log_prior: Current log-probability vector
+        log_likelihood: log P(answer | category) for the given answer
+        log_floor: log of the minimum posterior kept for every category
+    
+    Returns:
+        (updated log-probability vector, False if the answer has zero probability)
+    """
+    n_categories = log_prior.shape[0]
+    log_joint = np.empty(n_categories)
+    peak = -np.inf
+    for c in range(n_categories):
+        log_joint[c] = log_prior[c] + log_likelihood[c]
+        if log_joint[c] > peak:
+            peak = log_joint[c]
+    if peak == -np.inf:
+        return log_joint, False
+    
+    # log P(answer) = log Σ P(answer|category) * P(category)
+    total = 0.0
+    for c in range(n_categories):
+        total += np.exp(log_joint[c] - peak)
+    log_p_answer = peak + np.log(total)
+    
+    # Bayes' theorem, then floor to keep all categories alive
+    peak = -np.inf
+    for c in range(n_categories):
+        value = log_joint[c] - log_p_answer
+        if value < log_floor:
+            value = log_floor
+        log_joint[c] = value
+        if value > peak:
+            peak = value
+    
+    # Re-normalize to ensure sum = 1.0
+    total = 0.0
+    for c in range(n_categories):
+        total += np.exp(log_joint[c] - peak)
+    log_norm = peak + np.log(total)
+    for c in range(n_categories):
+        log_joint[c] -= log_norm
+    return log_joint, True
+
+@njit(cache=True)
+def posterior_update(
+    prior: np.ndarray,
+    likelihood: np.ndarray,
+    floor: float
+):
+    """
+    Floored Bayesian update of a probability vector in one pass
+    
+    Same steps as update_probability_vector: multiply by the likelihood,
+    normalize by P(answer), floor every category, then re-normalize.
+    
+    Args:
+        prior: Current probability vector
+        likelihood: P(answer | category) for the given answer
+        floor: Minimum posterior kept for every category
+    
+    Returns:
+        (updated probability vector, False if the answer has zero probability)
+    """
+    n_categories = prior.shape[0]
+    updated = np.empty(n_categories)
+    
+    # P(answer) = Σ P(answer|category) * P(category)
+    p_answer = 0.0
+    for c in range(n_categories):
+        updated[c] = likelihood[c] * prior[c]
+        p_answer += updated[c]
+    if p_answer == 0:
+        return updated, False
+    
+    # Bayes' theorem, then floor to keep all categories alive
+    total = 0.0
+    for c in range(n_categories):
+        value = updated[c] / p_answer
+        if value < floor:
+            value = floor
+        updated[c] = value
+        total += value
+    
+    # Re-normalize to ensure sum = 1.0
+    for c in range(n_categories):
+        updated[c] /= total
+    return updated, True
@@ -0,0 +1,334 @@
+"""
+Tests for iei_diagnostic_engine
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+import iei_diagnostic_engine as engine
+
+
+def test_entropy_accepts_read_only_mapping():
+    # Regression: MappingProxyType is a Mapping but not a dict
+    expected = -sum(p * math.log2(p) for p in engine.PRIOR_PROBABILITIES.values())
+    assert engine.calculate_entropy(engine.PRIOR_PROBABILITIES) == expected
+    assert math.isclose(engine.calculate_entropy(engine.PRIOR_VECTOR), expected, rel_tol=1e-12)
+    assert engine.calculate_entropy(dict(engine.PRIOR_PROBABILITIES)) == expected
+
+
+def test_entropy_skips_zero_probabilities():
+    assert engine.calculate_entropy(np.array([0.5, 0.5, 0.0])) == 1.0
+
+
+def test_select_next_question_returns_none_without_candidates():
+    probs = engine.initialize_prior_probabilities()
+    assert engine.select_next_question(
+        probs, [], engine.QUESTIONS, engine.CONDITIONAL_PROBABILITIES
+    ) is None
+
+
+def test_select_next_question_scores_questions_without_tables_as_uninformative():
+    questions = dict(engine.QUESTIONS)
+    questions['QX'] = engine.Question('QX', ('No', 'Yes'), 0.5)
+    probs = engine.initialize_prior_probabilities()
+    
+    # Without a table QX has IG 0, so any informative question beats it
+    assert engine.select_next_question(
+        probs, ['QX', 'Q1'], questions, engine.CONDITIONAL_PROBABILITIES
+    ) == 'Q1'
+    # Matches the tensor path, which zero-pads questions without a table
+    assert engine.select_next_question(
+        probs, ['QX'], questions, engine.CONDITIONAL_PROBABILITIES
+    ) == 'QX'
+    assert engine.select_next_question(
+        probs, ['Q1', 'Q2', 'QX'], questions, engine.CONDITIONAL_PROBABILITIES
+    ) == engine.select_next_question_from_tables(
+        engine.PRIOR_VECTOR, ['Q1', 'Q2', 'QX'], engine.LIKELIHOOD_TENSOR, engine.QUESTION_INDEX
+    )
+
+
+def test_engine_selects_questions_from_its_own_tables():
+    # Flatten every table except Q2's: only Q2 has information gain left
+    uniform = {cat: 1.0 for cat in engine.IEI_CATEGORIES}
+    conditional_probs = {
+        q_id: table if q_id == 'Q2' else {answer: uniform for answer in table}
+        for q_id, table in engine.CONDITIONAL_PROBABILITIES.items()
+    }
+    likelihoods = engine.build_likelihood_tensor(engine.QUESTION_IDS, conditional_probs)
+    
+    eng = engine.IEIDiagnosticEngine(likelihoods=likelihoods)
+    result = eng.process_answer('Q15', engine.QUESTIONS['Q15'].answer_options[0])
+    
+    assert result['next_question'] == 'Q2'
+    np.testing.assert_allclose(eng.probs, engine.PRIOR_VECTOR, rtol=1e-12)
+
+
+def test_loaded_tables_replay_module_posteriors(tmp_path):
+    path = str(tmp_path / 'tables.npz')
+    engine.save_likelihood_tables(path)
+    loaded = engine.IEIDiagnosticEngine(**engine.load_likelihood_tables(path))
+    default = engine.IEIDiagnosticEngine()
+    
+    q_id = engine.FIRST_QUESTION
+    for _ in range(10):
+        answer = engine.QUESTIONS[q_id].answer_options[-1]
+        expected = default.process_answer(q_id, answer)
+        result = loaded.process_answer(q_id, answer)
+        np.testing.assert_array_equal(loaded.probs, default.probs)
+        assert result['next_question'] == expected['next_question']
+        q_id = expected['next_question']
+
+
+def test_posterior_batch_grows_and_removes_by_swapping_last_row():
+    batch = engine.PosteriorBatch()
+    for session_id in range(40):
+        assert batch.add_session(session_id) == session_id
+    batch.apply_answer(batch.row_of[39], 'Q15', 'Fungi')
+    updated = batch.probs(39)
+    
+    assert batch.remove_session(5) == 39
+    assert batch.row_of[39] == 5 and batch.session_at[5] == 39
+    np.testing.assert_array_equal(batch.probs(39), updated)
+    assert batch.remove_session(38) is None
+    assert len(batch) == batch.log_probs.shape[0] == 38
+    assert 5 not in batch.row_of and 38 not in batch.row_of
+    
+    np.testing.assert_allclose(batch.probs(7), engine.PRIOR_VECTOR, rtol=1e-12)
+    with pytest.raises(KeyError):
+        batch.remove_session(5)
+
+
+def test_posterior_batch_apply_answers_matches_sequential_engines():
+    rng = np.random.default_rng(4)
+    batch = engine.PosteriorBatch()
+    engines = [engine.IEIDiagnosticEngine() for _ in range(6)]
+    rows = [batch.add_session(i) for i in range(len(engines))]
+    next_questions = [engine.FIRST_QUESTION] * len(engines)
+    
+    for _ in range(8):
+        pending = []
+        for i, eng in enumerate(engines):
+            q_id = next_questions[i]
+            options = engine.QUESTIONS[q_id].answer_options
+            answer = options[rng.integers(len(options))]
+            pending.append((rows[i], q_id, answer))
+            next_questions[i] = eng.process_answer(q_id, answer).get('next_question') or q_id
+        # Answers without a table row leave both the engine and the batch unchanged
+        np.testing.assert_array_equal(
+            batch.apply_answers(pending), [(q_id, a) in engine.QA_ROW for _, q_id, a in pending]
+        )
+        for i, eng in enumerate(engines):
+            np.testing.assert_allclose(batch.probs(i), eng.probs, rtol=1e-12)
+
+
+@pytest.mark.filterwarnings('error')
+def test_posterior_batch_keeps_rows_an_answer_is_impossible_for():
+    n_categories = len(engine.IEI_CATEGORIES)
+    with np.errstate(divide='ignore'):
+        log_likelihood_rows = np.log(np.array([
+            np.full(n_categories, 1.0 / n_categories),
+            np.eye(n_categories)[0],
+        ]))
+    batch = engine.PosteriorBatch(log_likelihood_rows, {('QA', 'Yes'): 1, ('QA', 'No'): 0})
+    batch.add_session('possible')
+    batch.add_session('impossible')
+    # Rule out the first category for one patient, leaving the answer impossible for it
+    batch.log_probs[1, 0] = -np.inf
+    before = batch.log_probs.copy()
+    
+    applied = batch.apply_answers([(0, 'QA', 'Yes'), (1, 'QA', 'Yes')])
+    
+    np.testing.assert_array_equal(applied, [True, False])
+    np.testing.assert_array_equal(batch.log_probs[1], before[1])
+    assert np.isclose(np.exp(batch.log_probs[0]).sum(), 1.0)
+
+
+def test_question_arrays_round_trip(tmp_path):
+    path = str(tmp_path / 'questions.npy')
+    engine.save_question_arrays(path)
+    records = engine.load_question_arrays(path)
+    
+    np.testing.assert_array_equal(records, engine.question_records())
+    np.testing.assert_array_equal(records['nopt'], engine.QUESTION_N_OPTIONS)
+    np.testing.assert_allclose(records['ig'], engine.QUESTION_BASE_IG, rtol=1e-6)
+
+
+def test_load_question_arrays_rejects_other_question_counts(tmp_path):
+    path = str(tmp_path / 'questions.npy')
+    np.save(path, engine.question_records()[:-1])
+    with pytest.raises(ValueError):
+        engine.load_question_arrays(path)
+
+
+def test_questions_blob_round_trip():
+    blob = engine.questions_to_blob()
+    records = engine.questions_from_blob(blob)
+    
+    np.testing.assert_array_equal(records, engine.question_records())
+    assert not records.flags.writeable
+    with pytest.raises(ValueError):
+        engine.questions_from_blob(blob[:-1])
+
+
+def test_encode_answer_features_one_hot_layout():
+    q_id = engine.QUESTION_IDS[3]
+    options = engine.QUESTIONS[q_id].answer_options
+    sessions = [
+        {},
+        {q_id: options[-1]},
+        {q_id: 'not an option', 'QX': options[0]},
+    ]
+    features = engine.encode_answer_features(sessions)
+    
+    assert features.shape == (3, engine.N_OPTION_FEATURES)
+    assert features.dtype == np.uint8
+    # Unanswered questions and invalid answers leave their columns empty
+    assert not features[0].any() and not features[2].any()
+    start = engine.OPTION_OFFSETS[engine.QUESTION_INDEX[q_id]]
+    assert np.flatnonzero(features[1]).tolist() == [start + len(options) - 1]
+    assert engine.answer_feature_index(q_id, options[-1]) == start + len(options) - 1
+
+
+def test_option_offsets_cover_every_answer_option_once():
+    columns = [
+        engine.answer_feature_index(q_id, option)
+        for q_id in engine.QUESTION_IDS
+        for option in engine.QUESTIONS[q_id].answer_options
+    ]
+    assert columns == list(range(engine.N_OPTION_FEATURES))
+
+
+def test_get_option_decodes_every_option_code():
+    for q_id in engine.QUESTION_IDS:
+        options = engine.QUESTIONS[q_id].answer_options
+        assert [engine.get_option(q_id, code) for code in range(len(options))] == list(options)
+        assert engine.is_valid_option_code(q_id, len(options) - 1)
+        assert not engine.is_valid_option_code(q_id, len(options))
+        assert not engine.is_valid_option_code(q_id, -1)
+
+
+def random_answer_sessions(n, seed=5):
+    """Random {question_id: answer} dicts, leaving about a third of questions unanswered"""
+    rng = np.random.default_rng(seed)
+    sessions = []
+    for _ in range(n):
+        answers = {}
+        for q_id in engine.QUESTION_IDS:
+            options = engine.QUESTIONS[q_id].answer_options
+            if rng.random() < 0.67:
+                answers[q_id] = options[rng.integers(len(options))]
+        sessions.append(answers)
+    return sessions
+
+
+def unfloored_log_scores(answers):
+    """log P(category) + Σ log P(answer | category) straight from the table dicts"""
+    return np.array([
+        math.log(engine.PRIOR_PROBABILITIES[cat]) + sum(
+            math.log(engine.CONDITIONAL_PROBABILITIES[q_id][answer][cat])
+            for q_id, answer in answers.items()
+            if answer in engine.CONDITIONAL_PROBABILITIES.get(q_id, {})
+        )
+        for cat in engine.IEI_CATEGORIES
+    ])
+
+
+def test_score_patients_is_the_unfloored_log_sum():
+    sessions = random_answer_sessions(20)
+    scores = engine.score_patients(np.array([engine.encode_table_answers(a) for a in sessions]))
+    
+    assert scores.shape == (len(sessions), len(engine.IEI_CATEGORIES))
+    for answers, row in zip(sessions, scores):
+        np.testing.assert_allclose(row, unfloored_log_scores(answers), rtol=1e-12)
+    np.testing.assert_array_equal(
+        engine.score_patients(np.full((1, len(engine.QUESTION_IDS)), -1)), [engine.LOG_PRIOR]
+    )
+
+
+def test_score_batch_matches_score_patients():
+    sessions = random_answer_sessions(20, seed=6)
+    batch_scores = engine.score_batch(engine.encode_table_rows(sessions))
+    patient_scores = engine.score_patients(
+        np.array([engine.encode_table_answers(a) for a in sessions])
+    )
+    
+    np.testing.assert_allclose(batch_scores, patient_scores, rtol=1e-12)
+    for answers, row in zip(sessions, batch_scores):
+        np.testing.assert_allclose(row, unfloored_log_scores(answers), rtol=1e-12)
+
+
+def test_conditional_probabilities_tsv_round_trip(tmp_path):
+    path = str(tmp_path / 'tables.tsv')
+    engine.export_conditional_probabilities_tsv(path)
+    tables = engine.load_conditional_probabilities_tsv(path)
+    
+    assert tables == engine.CONDITIONAL_PROBABILITIES
+    # File order is table order, so the rebuilt tensor lines up too
+    np.testing.assert_array_equal(
+        engine.build_likelihood_tensor(engine.QUESTION_IDS, tables), engine.LIKELIHOOD_TENSOR
+    )
+
+
+def test_top_evidence_ranks_table_rows_by_likelihood():
+    for cat in engine.IEI_CATEGORIES:
+        # Ties keep question then table order, as with a stable sort
+        expected = sorted(
+            (
+                (q_id, answer, answer_probs[cat])
+                for q_id in engine.QUESTION_IDS
+                for answer, answer_probs in engine.CONDITIONAL_PROBABILITIES.get(q_id, {}).items()
+            ),
+            key=lambda row: row[2],
+            reverse=True
+        )[:5]
+        assert engine.top_evidence(cat) == expected
+    assert len(engine.top_evidence('Combined_ID', k=2)) == 2
+
+
+def worst_case_information_gain(probs, q_id):
+    """H(current) - max over possible answers of H(posterior | answer), from the table dicts"""
+    table = engine.CONDITIONAL_PROBABILITIES.get(q_id)
+    if not table:
+        return 0.0
+    worst = 0.0
+    for answer_probs in table.values():
+        joint = {cat: answer_probs[cat] * probs[cat] for cat in engine.IEI_CATEGORIES}
+        p_answer = sum(joint.values())
+        if p_answer > 0:
+            posterior = {cat: p / p_answer for cat, p in joint.items()}
+            worst = max(worst, engine.calculate_entropy(posterior))
+    return engine.calculate_entropy(probs) - worst
+
+
+def test_worst_case_information_gain_batch_matches_scalar_reference():
+    rng = np.random.default_rng(7)
+    for prior in rng.dirichlet(np.ones(len(engine.IEI_CATEGORIES)), size=10):
+        probs = dict(zip(engine.IEI_CATEGORIES, prior.tolist()))
+        batch = engine.calculate_worst_case_information_gain_batch(prior, engine.LIKELIHOOD_TENSOR)
+        expected = [worst_case_information_gain(probs, q_id) for q_id in engine.QUESTION_IDS]
+        # The IG scan reads the float32 LIKELIHOOD_TENSOR
+        np.testing.assert_allclose(batch, expected, atol=1e-6)
+        # The least informative answer never beats the average
+        assert (batch <= engine.calculate_information_gain_batch(prior, engine.LIKELIHOOD_TENSOR) + 1e-12).all()
+
+
+def test_robust_strategy_selects_an_available_question():
+    probs = engine.initialize_prior_probabilities()
+    available = [q_id for q_id in engine.QUESTION_IDS if q_id != engine.FIRST_QUESTION]
+    chosen = engine.select_next_question(
+        probs, available, engine.QUESTIONS, engine.CONDITIONAL_PROBABILITIES, strategy='robust'
+    )
+    assert chosen in available
+    
+    eng = engine.IEIDiagnosticEngine(strategy='robust')
+    q_id = engine.FIRST_QUESTION
+    for _ in range(5):
+        result = eng.process_answer(q_id, engine.QUESTIONS[q_id].answer_options[0])
+        assert result['next_question'] in engine.QUESTIONS
+        assert result['next_question'] not in eng.asked_questions
+        q_id = result['next_question']
+    
+    with pytest.raises(ValueError):
+        engine.IEIDiagnosticEngine(strategy='optimistic')
@@ -0,0 +1,155 @@
+"""
+Compiled kernels (iei_kernels) against the NumPy fallback, and replay of
+recorded sessions through both paths
+
+tests/data/replay_sessions.json was recorded with the engine as it stood
+before the kernels and lookup tables were introduced: for every turn it
+holds the posterior, the status, the chosen next question and all questions
+whose weighted information gain ties with it exactly.
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+import iei_diagnostic_engine as engine
+
+KERNELS = ('log_posterior_update', 'posterior_update', 'best_weighted_question', 'masked_sum')
+
+REPLAY_PATH = os.path.join(os.path.dirname(__file__), 'data', 'replay_sessions.json')
+
+
+def use_numpy_fallback(monkeypatch):
+    """Route the engine through its NumPy code paths, as without numba"""
+    for name in KERNELS:
+        monkeypatch.setattr(engine, name, None)
+    # Memoized selections were computed by whichever path ran first
+    engine.select_next_question_cached.cache_clear()
+
+
+@pytest.fixture
+def kernels():
+    pytest.importorskip('numba')
+    kernels = pytest.importorskip('iei_kernels')
+    engine.select_next_question_cached.cache_clear()
+    return kernels
+
+
+@pytest.fixture(params=['kernels', 'numpy'])
+def backend(request, monkeypatch):
+    if request.param == 'kernels':
+        request.getfixturevalue('kernels')
+    else:
+        use_numpy_fallback(monkeypatch)
+    yield request.param
+    engine.select_next_question_cached.cache_clear()
+
+
+def random_posteriors(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.dirichlet(np.full(len(engine.IEI_CATEGORIES), 0.5), size=n)
+
+
+def weighted_score(probs, question_id):
+    """Weighted IG from the dict-based reference functions"""
+    leading = {cat for cat, _ in sorted(probs.items(), key=lambda x: x[1], reverse=True)[:3]}
+    question = engine.QUESTIONS[question_id]
+    return (
+        engine.calculate_information_gain(probs, question_id, engine.CONDITIONAL_PROBABILITIES)
+        * engine.calculate_relevance_weight(question_id, leading, engine.CONDITIONAL_PROBABILITIES)
+        * (question.nodal_weight if question.is_nodal else 1.0)
+    )
+
+
+def test_log_posterior_update_matches_numpy(kernels, monkeypatch):
+    log_priors = np.log(random_posteriors(50))
+    rows = engine.LOG_LIKELIHOOD_ROWS
+    compiled = [
+        [engine.update_log_posterior(log_prior, row) for row in rows]
+        for log_prior in log_priors
+    ]
+
+    use_numpy_fallback(monkeypatch)
+    for log_prior, expected_rows in zip(log_priors, compiled):
+        for row, expected in zip(rows, expected_rows):
+            np.testing.assert_allclose(
+                expected, engine.update_log_posterior(log_prior, row), rtol=1e-12, atol=1e-12
+            )
+
+
+def test_posterior_update_matches_numpy(kernels, monkeypatch):
+    priors = random_posteriors(50, seed=1)
+    rows = np.exp(engine.LOG_LIKELIHOOD_ROWS)
+    compiled = [[engine.update_probability_vector(p, row) for row in rows] for p in priors]
+
+    use_numpy_fallback(monkeypatch)
+    for prior, expected_rows in zip(priors, compiled):
+        for row, expected in zip(rows, expected_rows):
+            np.testing.assert_allclose(
+                expected, engine.update_probability_vector(prior, row), rtol=1e-12
+            )
+
+
+def test_impossible_answer_is_rejected_on_both_paths(kernels, monkeypatch):
+    impossible = np.full(len(engine.IEI_CATEGORIES), -np.inf)
+    assert engine.update_log_posterior(engine.LOG_PRIOR, impossible) is None
+    assert engine.update_probability_vector(engine.PRIOR_VECTOR, np.exp(impossible)) is None
+
+    use_numpy_fallback(monkeypatch)
+    assert engine.update_log_posterior(engine.LOG_PRIOR, impossible) is None
+    assert engine.update_probability_vector(engine.PRIOR_VECTOR, np.exp(impossible)) is None
+
+
+def test_masked_sum_matches_numpy(kernels, monkeypatch):
+    rng = np.random.default_rng(2)
+    n_questions = len(engine.QUESTION_IDS)
+    masks = [0, (1 << n_questions) - 1] + [
+        int(bits) for bits in rng.integers(0, 1 << n_questions, size=200)
+    ]
+    compiled = [engine.total_effective_ig(mask) for mask in masks]
+
+    use_numpy_fallback(monkeypatch)
+    for mask, expected in zip(masks, compiled):
+        assert engine.total_effective_ig(mask) == pytest.approx(expected, rel=1e-12)
+
+
+def test_best_weighted_question_matches_numpy(kernels, monkeypatch):
+    rng = np.random.default_rng(3)
+    cases = []
+    for probs in random_posteriors(100, seed=3):
+        available = [q_id for q_id in engine.QUESTION_IDS if rng.random() < 0.7]
+        cases.append((dict(zip(engine.IEI_CATEGORIES, probs.tolist())), available))
+
+    def select(probs, available):
+        return engine.select_next_question(
+            probs, available, engine.QUESTIONS, engine.CONDITIONAL_PROBABILITIES
+        )
+    compiled = [select(probs, available) for probs, available in cases]
+
+    use_numpy_fallback(monkeypatch)
+    for (probs, available), expected in zip(cases, compiled):
+        chosen = select(probs, available)
+        if chosen != expected:
+            # Exact ties may resolve either way
+            assert weighted_score(probs, chosen) == pytest.approx(
+                weighted_score(probs, expected), rel=1e-12
+            )
+
+
+def test_replay_matches_recorded_sessions(backend):
+    with open(REPLAY_PATH) as f:
+        recorded = json.load(f)
+    assert recorded['categories'] == engine.IEI_CATEGORIES
+
+    for steps in recorded['sessions']:
+        eng = engine.IEIDiagnosticEngine()
+        for step in steps:
+            result = eng.process_answer(step['question'], step['answer'])
+            assert result['status'] == step['status']
+            # Posterior-side tables are float64 (LIKELIHOOD_TENSOR_F64); only the
+            # log-space update's rounding separates them from the recording
+            np.testing.assert_allclose(eng.probs, step['posterior'], rtol=1e-12)
+            if step['status'] == 'continue':
+                assert result['next_question'] in step['tied_questions']